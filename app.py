@@ -1,14 +1,147 @@
 """
 Flask API V2 - Jednodušší a čistší
 """
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, send_file
 from flask_cors import CORS
 import os
-from planner_sheets_v2 import plan_shifts_v2
+import json
+import math
+import queue
+from planner_sheets_v2 import (plan_shifts_v2, plan_batch, commit_preview, batch_order, InvalidBatch,
+                               SOLVERS)
+from multistart import MAX_STARTS
+import plan_jobs
+import plan_previews
+import metrics
+import profiling
+import sheet_lock
 
 app = Flask(__name__)
 CORS(app)
 
+# Volitelné parametry plánování, které se předávají z requestu
+PLAN_OPTIONS = ('solver', 'seed', 'starts', 'time_budget', 'optimize_seconds', 'optimize_iters',
+                'cache', 'dry_run')
+# Parametry, které v query stringu (/plan/stream) přicházejí jako text
+FLAG_OPTIONS = ('cache', 'dry_run')
+# Po kolika sekundách bez události poslat do SSE streamu keepalive
+STREAM_HEARTBEAT = 15
+
+# Počítadla solveru, která se vrací s profilem
+PROFILE_SOLVER_KEYS = ('seed_seconds', 'attempts', 'nodes', 'backtracks', 'max_depth')
+
+class InvalidOption(ValueError):
+    """Neplatný parametr plánování v requestu (odpověď 400)"""
+
+def _int_option(value):
+    """Celé číslo z JSON nebo z textu (query string), jinak None"""
+    if isinstance(value, str) and value.strip().isdigit():
+        return int(value)
+    if isinstance(value, int) and not isinstance(value, bool):
+        return value
+    return None
+
+def _float_option(value):
+    """Konečné číslo z JSON nebo z textu (query string), jinak None"""
+    if isinstance(value, str):
+        try:
+            value = float(value)
+        except ValueError:
+            return None
+    if isinstance(value, (int, float)) and not isinstance(value, bool) and math.isfinite(value):
+        return float(value)
+    return None
+
+def parse_starts(value):
+    """starts - kladné celé číslo, nejvýš MAX_STARTS"""
+    number = _int_option(value)
+    if number is None or number < 1:
+        raise InvalidOption(f"Parametr 'starts' musí být kladné celé číslo, ne {value!r}")
+    return min(number, MAX_STARTS)
+
+def parse_seed(value):
+    """seed - nezáporné celé číslo"""
+    number = _int_option(value)
+    if number is None or number < 0:
+        raise InvalidOption(f"Parametr 'seed' musí být nezáporné celé číslo, ne {value!r}")
+    return number
+
+def parse_time_budget(value):
+    """time_budget - kladný počet sekund"""
+    number = _float_option(value)
+    if number is None or number <= 0:
+        raise InvalidOption(f"Parametr 'time_budget' musí být kladné číslo, ne {value!r}")
+    return number
+
+def parse_optimize_seconds(value):
+    """optimize_seconds - nezáporný počet sekund (0 = bez časového limitu)"""
+    number = _float_option(value)
+    if number is None or number < 0:
+        raise InvalidOption(f"Parametr 'optimize_seconds' musí být nezáporné číslo, ne {value!r}")
+    return number
+
+def parse_optimize_iters(value):
+    """optimize_iters - nezáporné celé číslo (0 = bez limitu tahů)"""
+    number = _int_option(value)
+    if number is None or number < 0:
+        raise InvalidOption(f"Parametr 'optimize_iters' musí být nezáporné celé číslo, ne {value!r}")
+    return number
+
+def parse_solver(value):
+    """solver - jeden z planner_sheets_v2.SOLVERS"""
+    if not isinstance(value, str) or value not in SOLVERS:
+        raise InvalidOption(f"Neznámý solver {value!r} (možnosti: {', '.join(SOLVERS)})")
+    return value
+
+# Kontrola a převod parametrů plánování (ostatní se předávají beze změny)
+OPTION_PARSERS = {
+    'solver': parse_solver,
+    'starts': parse_starts,
+    'seed': parse_seed,
+    'time_budget': parse_time_budget,
+    'optimize_seconds': parse_optimize_seconds,
+    'optimize_iters': parse_optimize_iters,
+}
+
+def plan_options(data):
+    """Vybere z JSON requestu známé parametry plánování, neplatné jsou InvalidOption"""
+    options = {key: data[key] for key in PLAN_OPTIONS if key in data}
+    for key, parse in OPTION_PARSERS.items():
+        if key in options:
+            options[key] = parse(options[key])
+    return options
+
+def plan_sheet(sheet_name, options, progress=None):
+    """plan_shifts_v2 - pro jeden list vždy jen jeden výpočet naráz (viz sheet_lock)"""
+    result, shared = sheet_lock.single_flight([sheet_name], options, plan_shifts_v2,
+                                              sheet_name, options, progress=progress)
+    return dict(result, shared=True) if shared else result
+
+def plan_sheets(sheet_names, options, progress=None):
+    """plan_batch se zámky všech listů dávky"""
+    result, shared = sheet_lock.single_flight(sheet_names, options, plan_batch,
+                                              sheet_names, options, progress=progress)
+    return dict(result, shared=True) if shared else result
+
+def commit_sheet(preview_id, progress=None):
+    """commit_preview se zámkem listu z náhledu - stejný náhled se zapíše jen jednou"""
+    sheet_name = plan_previews.load(preview_id)['sheet']
+    result, shared = sheet_lock.single_flight([sheet_name], {"commit": preview_id},
+                                              commit_preview, preview_id, progress=progress)
+    return dict(result, shared=True) if shared else result
+
+def busy_response(e):
+    return jsonify({
+        "status": "error",
+        "message": str(e)
+    }), 409
+
+def bad_request(e):
+    return jsonify({
+        "status": "error",
+        "message": str(e)
+    }), 400
+
 @app.route('/', methods=['GET'])
 def home():
     return jsonify({
@@ -21,11 +154,21 @@ def home():
 def health():
     return jsonify({"status": "healthy"})
 
+@app.route('/metrics', methods=['GET'])
+def metrics_endpoint():
+    """Prometheus metriky (doby kroků, volání Sheets API, solver, cache)"""
+    body, content_type = metrics.render()
+    return Response(body, content_type=content_type)
+
 @app.route('/plan', methods=['POST'])
 def plan():
     """
     Endpoint pro plánování
     Očekává: { "sheet_name": "CERVEN" }
+    S "dry_run": true nic nezapíše a vrátí náhled (rozvrh + statistiky sester),
+    zapsat ho jde přes POST /plan/commit s jeho id
+    S "async": true vrátí hned job id, stav je na GET /plan/<job_id>
+    S "profile": true (nebo počet řádků) vrátí i profil requestu (jen s PLAN_PROFILING=1)
     """
     try:
         data = request.get_json() or {}
@@ -33,7 +176,18 @@ def plan():
         
         print(f"Přijat request pro plánování: {sheet_name}")
         
-        result = plan_shifts_v2(sheet_name)
+        if data.get('profile'):
+            return plan_profiled(sheet_name, data)
+        
+        if data.get('async'):
+            job_id = plan_jobs.submit(plan_sheet, sheet_name, plan_options(data))
+            return jsonify({
+                "status": "queued",
+                "job_id": job_id,
+                "status_url": f"/plan/{job_id}"
+            }), 202
+        
+        result = plan_sheet(sheet_name, plan_options(data))
         
         return jsonify({
             "status": "success",
@@ -41,6 +195,12 @@ def plan():
             "details": result
         })
     
+    except InvalidOption as e:
+        return bad_request(e)
+    
+    except sheet_lock.SheetBusy as e:
+        return busy_response(e)
+    
     except Exception as e:
         import traceback
         error_details = traceback.format_exc()
@@ -52,6 +212,231 @@ def plan():
             "details": error_details
         }), 500
 
+@app.route('/plan/commit', methods=['POST'])
+def plan_commit():
+    """
+    Zápis náhledu z POST /plan s "dry_run"
+    Očekává: { "preview_id": "..." }
+    Pokud se list od náhledu změnil, vrátí 409 a nic nezapíše
+    """
+    try:
+        data = request.get_json() or {}
+        preview_id = data.get('preview_id')
+        
+        print(f"Přijat request pro zápis náhledu: {preview_id}")
+        
+        result = commit_sheet(preview_id)
+        
+        return jsonify({
+            "status": "success",
+            "message": f"Náhled zapsán do {result['sheet']}",
+            "details": result
+        })
+    
+    except plan_previews.PreviewNotFound as e:
+        return jsonify({
+            "status": "error",
+            "message": str(e)
+        }), 404
+    
+    except (plan_previews.PreviewOutdated, sheet_lock.SheetBusy) as e:
+        return busy_response(e)
+    
+    except Exception as e:
+        import traceback
+        error_details = traceback.format_exc()
+        print(f"CHYBA: {error_details}")
+        
+        return jsonify({
+            "status": "error",
+            "message": str(e),
+            "details": error_details
+        }), 500
+
+def plan_profiled(sheet_name, data):
+    """Plánování pod profilerem - bez cache a se seedy v jednom procesu"""
+    if not profiling.PROFILING_ENABLED:
+        return jsonify({
+            "status": "error",
+            "message": "Profilování je vypnuté (nastav PLAN_PROFILING=1)"
+        }), 403
+    if data.get('async'):
+        return jsonify({
+            "status": "error",
+            "message": "Profilovat lze jen synchronní plánování"
+        }), 400
+    
+    top = data['profile']
+    top = top if isinstance(top, int) and not isinstance(top, bool) else profiling.DEFAULT_TOP
+    options = dict(plan_options(data), cache=False, parallel=False)
+    result, report = profiling.run_profiled(plan_sheet, sheet_name, options, top=top)
+    report["solver"] = {key: result["solver"][key] for key in PROFILE_SOLVER_KEYS
+                        if key in result["solver"]}
+    report["download_url"] = f"/plan/profile/{report['id']}"
+    
+    return jsonify({
+        "status": "success",
+        "message": f"Plánování dokončeno pro {sheet_name}",
+        "details": result,
+        "profile": report
+    })
+
+@app.route('/plan/profile/<profile_id>', methods=['GET'])
+def plan_profile_download(profile_id):
+    """Stažení uloženého profilu (.pstats)"""
+    path = profiling.profile_path(profile_id)
+    if path is None:
+        return jsonify({
+            "status": "error",
+            "message": f"Profil {profile_id} neexistuje"
+        }), 404
+    return send_file(path, mimetype="application/octet-stream", as_attachment=True,
+                     download_name=f"plan-{profile_id}.pstats")
+
+@app.route('/plan/batch', methods=['POST'])
+def plan_batch_endpoint():
+    """
+    Plánování víc měsíců po sobě (konec měsíce navazuje na další)
+    Očekává: { "sheet_names": ["CERVEN", "CERVENEC", "SRPEN"] }
+    Listy se seřadí podle měsíce, musí jít o souvislou řadu (jinak 400)
+    S "async": true vrátí hned job id jako POST /plan
+    """
+    try:
+        data = request.get_json() or {}
+        sheet_names = data.get('sheet_names') or []
+        if (not isinstance(sheet_names, list) or not sheet_names
+                or not all(isinstance(name, str) for name in sheet_names)):
+            return jsonify({
+                "status": "error",
+                "message": "Chybí seznam listů 'sheet_names'"
+            }), 400
+        
+        if data.get('dry_run'):
+            return jsonify({
+                "status": "error",
+                "message": "Náhled (dry_run) je jen pro jeden list - POST /plan"
+            }), 400
+        
+        # Měsíce po sobě (konec měsíce navazuje na další) - ještě před zámky a čtením
+        sheet_names = batch_order(sheet_names)
+        
+        print(f"Přijat request pro plánování dávky: {', '.join(sheet_names)}")
+        
+        if data.get('async'):
+            job_id = plan_jobs.submit(plan_sheets, sheet_names, plan_options(data))
+            return jsonify({
+                "status": "queued",
+                "job_id": job_id,
+                "status_url": f"/plan/{job_id}"
+            }), 202
+        
+        result = plan_sheets(sheet_names, plan_options(data))
+        
+        return jsonify({
+            "status": "success",
+            "message": f"Plánování dokončeno pro {', '.join(sheet_names)}",
+            "details": result
+        })
+    
+    except (InvalidOption, InvalidBatch) as e:
+        return bad_request(e)
+    
+    except sheet_lock.SheetBusy as e:
+        return busy_response(e)
+    
+    except Exception as e:
+        import traceback
+        error_details = traceback.format_exc()
+        print(f"CHYBA: {error_details}")
+        
+        return jsonify({
+            "status": "error",
+            "message": str(e),
+            "details": error_details
+        }), 500
+
+def sse(event, data):
+    """Jedna Server-Sent Events zpráva"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+def stream_plan(sheet_name, options, events, progress=None):
+    """Plánování pro /plan/stream - průběh jde do jobu i do fronty streamu"""
+    def forward(event, data):
+        if progress:
+            progress(event, data)
+        events.put((event, data))
+    
+    try:
+        result = plan_sheet(sheet_name, options, progress=forward)
+    except Exception as e:
+        events.put(("error", {"message": str(e)}))
+        raise
+    events.put(("done", result))
+    return result
+
+@app.route('/plan/stream', methods=['GET'])
+def plan_stream():
+    """
+    Plánování s průběhem jako Server-Sent Events
+    GET /plan/stream?sheet_name=CERVEN (+ stejné volitelné parametry jako /plan)
+    Události: queued, stage, solver, written, done / error
+    Plánování běží jako job - po odpojení klienta doběhne a stav je na GET /plan/<job_id>
+    (status_url z události queued, odpoví kterýkoli worker - viz plan_jobs)
+    """
+    data = request.args.to_dict()
+    sheet_name = data.get('sheet_name', 'CERVEN')
+    for key in FLAG_OPTIONS:
+        if key in data:
+            data[key] = data[key].lower() not in ('0', 'false', 'no')
+    
+    try:
+        options = plan_options(data)
+    except InvalidOption as e:
+        return bad_request(e)
+    
+    print(f"Přijat request pro plánování (stream): {sheet_name}")
+    
+    events = queue.Queue()
+    job_id = plan_jobs.submit(stream_plan, sheet_name, options, events)
+    
+    def generate():
+        yield sse("queued", {"job_id": job_id, "status_url": f"/plan/{job_id}"})
+        while True:
+            try:
+                event, payload = events.get(timeout=STREAM_HEARTBEAT)
+            except queue.Empty:
+                # Komentář, aby proxy nezavřela nečinné spojení
+                yield ": keepalive\n\n"
+                continue
+            yield sse(event, payload)
+            if event in ("done", "error"):
+                break
+    
+    return Response(generate(), mimetype="text/event-stream", headers={
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no",
+    })
+
+@app.route('/plan/<job_id>', methods=['GET'])
+def plan_status(job_id):
+    """Stav asynchronního plánování"""
+    job = plan_jobs.get_job(job_id)
+    if job is None:
+        return jsonify({
+            "status": "error",
+            "message": f"Job {job_id} neexistuje"
+        }), 404
+    
+    return jsonify({
+        "status": job["state"],
+        "job_id": job_id,
+        "stage": job["stage"],
+        "month": job["month"],
+        "solver": job["solver"],
+        "details": job["result"],
+        "error": job["error"]
+    })
+
 if __name__ == '__main__':
     port = int(os.environ.get('PORT', 5000))
     app.run(host='0.0.0.0', port=port, debug=False)
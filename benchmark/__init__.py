@@ -0,0 +1,10 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark solverů bez živé tabulky
+Syntetická oddělení (ward) + běh solverů přes víc seedů, výstup jako JSON report
+
+Spuštění: python -m benchmark --help
+"""
+
+from benchmark.ward import make_ward
+from benchmark.runner import SOLVERS, run_benchmark, count_violations
@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+"""
+python -m benchmark [--scenario medium] [--solver fair] [--seeds 20] [--output report.json]
+Vlastní oddělení: --nurses 25 --prefill 0.1 --station-idx 5 ...
+"""
+
+import sys
+import json
+import argparse
+
+from benchmark.runner import DEFAULT_SCENARIOS, SOLVERS, run_benchmark
+
+
+def parse_mix(text):
+    """'1:3,0.5:1' -> {1.0: 3.0, 0.5: 1.0}"""
+    mix = {}
+    for part in text.split(","):
+        uvazek, weight = part.split(":")
+        mix[float(uvazek)] = float(weight)
+    return mix
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmark",
+                                     description="Benchmark solverů na syntetických odděleních")
+    parser.add_argument("--scenario", action="append", choices=sorted(DEFAULT_SCENARIOS),
+                        help="předdefinovaný scénář (lze opakovat, default všechny)")
+    parser.add_argument("--solver", action="append", choices=sorted(SOLVERS),
+                        help="solver (lze opakovat, default všechny)")
+    parser.add_argument("--seeds", type=int, default=10, help="počet seedů na scénář")
+    parser.add_argument("--first-seed", type=int, default=0)
+    parser.add_argument("--output", "-o", help="soubor pro JSON report (default stdout)")
+
+    custom = parser.add_argument_group("vlastní oddělení (místo předdefinovaných scénářů)")
+    custom.add_argument("--nurses", type=int)
+    custom.add_argument("--days", type=int, help="délka měsíce (default podle kalendáře)")
+    custom.add_argument("--year", type=int)
+    custom.add_argument("--month", type=int)
+    custom.add_argument("--uvazek-mix", type=parse_mix, help="úvazek:váha, např. 1:3,0.5:1")
+    custom.add_argument("--prefill", type=float, help="podíl předvyplněných dnů (DOV/K/R)")
+    custom.add_argument("--station-idx", type=int, help="pozice staniční sestry")
+    args = parser.parse_args(argv)
+
+    params = {key: getattr(args, key) for key in
+              ("nurses", "days", "year", "month", "uvazek_mix", "prefill", "station_idx")
+              if getattr(args, key) is not None}
+    if params:
+        scenarios = {"custom": params}
+    elif args.scenario:
+        scenarios = {name: DEFAULT_SCENARIOS[name] for name in args.scenario}
+    else:
+        scenarios = DEFAULT_SCENARIOS
+
+    # Průběh na stderr, aby šel report na stdout přesměrovat
+    report = run_benchmark(scenarios, args.solver, seeds=args.seeds, first_seed=args.first_seed,
+                           log=lambda line: print(line, file=sys.stderr))
+
+    # Klíče úvazků musí být v JSON řetězce
+    for params in report["scenarios"].values():
+        if "uvazek_mix" in params:
+            params["uvazek_mix"] = {str(k): v for k, v in params["uvazek_mix"].items()}
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"✓ Report uložen: {args.output}", file=sys.stderr)
+    else:
+        json.dump(report, sys.stdout, ensure_ascii=False, indent=2)
+        print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,221 @@
+# -*- coding: utf-8 -*-
+"""
+Běh solverů nad syntetickými odděleními a souhrn výsledků
+"""
+
+import io
+import time
+import platform
+import datetime
+import statistics
+import contextlib
+
+import planner_sheets
+import planner_sheets_v2
+import shift_rules
+from multistart import schedule_score
+from shift_rules import MIN_FREE_WEEKENDS
+from work_calendar import day_types
+from benchmark.ward import make_ward
+
+# Předdefinované scénáře (parametry make_ward)
+DEFAULT_SCENARIOS = {
+    "small": {"nurses": 12, "prefill": 0.05},
+    "medium": {"nurses": 20, "prefill": 0.05},
+    "large": {"nurses": 35, "prefill": 0.1},
+    "dense": {"nurses": 20, "prefill": 0.2},
+    "station-last": {"nurses": 20, "prefill": 0.05, "station_idx": 19},
+}
+
+
+def _fair(ward, seed, stats):
+    return planner_sheets_v2.fair_planner(
+        ward['employees'], ward['fixed'], ward['fixed_hours'], ward['days'],
+        ward['station_idx'], seed=seed, day_index=day_types(ward['year'], ward['month']))
+
+
+def _matching(ward, seed, stats):
+    return planner_sheets_v2.matching_planner(
+        ward['employees'], ward['fixed'], ward['fixed_hours'], ward['days'],
+        ward['station_idx'], seed=seed, day_index=day_types(ward['year'], ward['month']))
+
+
+def _backtrack(ward, seed, stats):
+    return planner_sheets.run_planner(
+        ward['employees'], ward['fixed'], ward['fixed_hours'], ward['days'],
+        ward['year'], ward['month'], ward['station_idx'], seed=seed, stats=stats)
+
+
+# Název -> funkce(ward, seed, stats) vracející (assign, hours) nebo None
+SOLVERS = {
+    "fair": _fair,
+    "matching": _matching,
+    "backtrack": _backtrack,
+}
+
+
+def count_violations(assign, fixed, max_consec=planner_sheets_v2.MAX_CONSEC_SHIFTS):
+    """
+    Počet porušení hard pravidel, na kterých se podílí naplánovaná (ne předvyplněná) směna
+    S shift_rules.MAX_NIGHTS_PER_7_DAYS i 7denní okna s víc nocemi - hranice okna:
+    s limitem 3 a N ve dnech 0, 2, 4, 7 je vše v pořádku (dny 1..7 mají 3 N),
+    N ve dnech 0, 2, 4, 6 je jedno porušení (dny 0..6 mají 4 N)
+    """
+    max_nights = shift_rules.MAX_NIGHTS_PER_7_DAYS
+    violations = 0
+    for row, fixed_row in zip(assign, fixed):
+        planned = [v in ("D", "N") and f is None for v, f in zip(row, fixed_row)]
+        work = [v in ("D", "N") for v in row]
+        for di in range(1, len(row)):
+            # Po N musí volno
+            if row[di - 1] == "N" and work[di] and (planned[di - 1] or planned[di]):
+                violations += 1
+        for di in range(max_consec, len(row)):
+            # Víc než max_consec směn za sebou
+            window = range(di - max_consec, di + 1)
+            if all(work[dj] for dj in window) and any(planned[dj] for dj in window):
+                violations += 1
+        if max_nights is not None:
+            for start in range(max(1, len(row) - 6)):
+                # Víc než max_nights N v 7 po sobě jdoucích dnech
+                window = range(start, min(start + 7, len(row)))
+                nights = [dj for dj in window if row[dj] == "N"]
+                if len(nights) > max_nights and any(planned[dj] for dj in nights):
+                    violations += 1
+    return violations
+
+
+def weekend_shortfall(assign, year, month, station_idx):
+    """Kolik volných víkendů celkem chybí sestrám do MIN_FREE_WEEKENDS"""
+    weekend_of, holiday = day_types(year, month)
+    weekends = max(weekend_of) + 1
+    missing = 0
+    for i, row in enumerate(assign):
+        if i == station_idx:
+            continue
+        worked = {weekend_of[di] for di, v in enumerate(row[:len(weekend_of)])
+                  if v in ("D", "N") and weekend_of[di] >= 0}
+        missing += max(0, MIN_FREE_WEEKENDS - (weekends - len(worked)))
+    return missing
+
+
+def holiday_spread(assign, year, month, station_idx):
+    """Rozdíl mezi nejvíc a nejméně vytíženou sestrou ve směnách o svátcích"""
+    weekend_of, holiday = day_types(year, month)
+    counts = [sum(1 for di, v in enumerate(row[:len(holiday)]) if v in ("D", "N") and holiday[di])
+              for i, row in enumerate(assign) if i != station_idx]
+    return max(counts) - min(counts) if counts else 0
+
+
+def run_once(solver_name, ward, seed):
+    """Jeden běh solveru - vrací záznam do reportu"""
+    stats = {}
+    started = time.perf_counter()
+    # Solvery hodně vypisují, v benchmarku nás zajímá jen výsledek
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = SOLVERS[solver_name](ward, seed, stats)
+    seconds = time.perf_counter() - started
+
+    record = {
+        "solver": solver_name,
+        "seed": seed,
+        "seconds": round(seconds, 4),
+        "solved": bool(result),
+        "attempts": stats.get("attempts"),
+        "nodes": stats.get("nodes"),
+        "backtracks": stats.get("backtracks"),
+    }
+    if result:
+        assign, hours = result
+        target = [e['target_hours'] for e in ward['employees']]
+        unfilled, spread = schedule_score(assign, hours, target, ward['station_idx'],
+                                          planner_sheets_v2.REQ_D, planner_sheets_v2.REQ_N)
+        record.update({
+            "unfilled": unfilled,
+            "spread": round(spread, 2),
+            "violations": count_violations(assign, ward['fixed']),
+            "weekend_shortfall": weekend_shortfall(assign, ward['year'], ward['month'],
+                                                   ward['station_idx']),
+            "holiday_spread": holiday_spread(assign, ward['year'], ward['month'],
+                                             ward['station_idx']),
+        })
+    return record
+
+
+def _percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(q * (len(values) - 1))))]
+
+
+def summarize(runs):
+    """Souhrn běhů jednoho solveru v jednom scénáři"""
+    solved = [r for r in runs if r['solved']]
+    seconds = [r['seconds'] for r in runs]
+    summary = {
+        "runs": len(runs),
+        "failed": len(runs) - len(solved),
+        "seconds_median": round(statistics.median(seconds), 4),
+        "seconds_p95": round(_percentile(seconds, 0.95), 4),
+        "seconds_max": round(max(seconds), 4),
+    }
+    if solved:
+        summary.update({
+            "unfilled_mean": round(statistics.mean(r['unfilled'] for r in solved), 2),
+            "unfilled_max": max(r['unfilled'] for r in solved),
+            "spread_mean": round(statistics.mean(r['spread'] for r in solved), 2),
+            "spread_max": max(r['spread'] for r in solved),
+            "violations_total": sum(r['violations'] for r in solved),
+            "weekend_shortfall_total": sum(r['weekend_shortfall'] for r in solved),
+            "holiday_spread_max": max(r['holiday_spread'] for r in solved),
+        })
+    for key in ("attempts", "nodes", "backtracks"):
+        values = [r[key] for r in runs if r[key] is not None]
+        if values:
+            summary[f"{key}_mean"] = round(statistics.mean(values), 1)
+    return summary
+
+
+def run_benchmark(scenarios=None, solvers=None, seeds=10, first_seed=0, log=print):
+    """
+    Spustí každý solver na každém scénáři pro seeds seedů
+    Pro každý seed se vygeneruje nové oddělení (make_ward(seed=...)) a solver
+    dostane stejný seed
+    Vrací report jako slovník (viz benchmark.__main__)
+    """
+    scenarios = scenarios or DEFAULT_SCENARIOS
+    solvers = solvers or list(SOLVERS)
+    unknown = [s for s in solvers if s not in SOLVERS]
+    if unknown:
+        raise ValueError(f"Neznámý solver: {', '.join(unknown)} (možnosti: {', '.join(SOLVERS)})")
+
+    runs = []
+    summary = {}
+    for name, params in scenarios.items():
+        summary[name] = {}
+        wards = [make_ward(seed=seed, **params) for seed in range(first_seed, first_seed + seeds)]
+        for solver_name in solvers:
+            records = []
+            for seed, ward in enumerate(wards, first_seed):
+                record = run_once(solver_name, ward, seed)
+                record["scenario"] = name
+                records.append(record)
+            runs.extend(records)
+            summary[name][solver_name] = stats = summarize(records)
+            if log:
+                log(f"{name:14s} {solver_name:10s} median={stats['seconds_median']:.3f}s "
+                    f"failed={stats['failed']} unfilled={stats.get('unfilled_mean', '-')} "
+                    f"spread={stats.get('spread_mean', '-')} "
+                    f"violations={stats.get('violations_total', '-')} "
+                    f"weekends={stats.get('weekend_shortfall_total', '-')} "
+                    f"holidays={stats.get('holiday_spread_max', '-')}")
+
+    return {
+        "created": datetime.datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "seeds": seeds,
+        "first_seed": first_seed,
+        "scenarios": scenarios,
+        "summary": summary,
+        "runs": runs,
+    }
@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+"""
+Generátor syntetického oddělení - stejné vstupy, jaké solverům připraví
+prepare_month z reálného listu
+"""
+
+import calendar
+import datetime
+import random
+
+from planner_sheets_v2 import HOURS_FIXED
+
+# Úvazek -> váha při losování
+DEFAULT_UVAZEK_MIX = {1.0: 3, 0.5: 1}
+# Předvyplněné hodnoty a jejich váha
+DEFAULT_PREFILL_VALUES = {"DOV": 3, "K": 1, "R": 1}
+DEFAULT_FUND = 168.0
+
+
+def make_ward(nurses=20, year=2026, month=6, days=None, uvazek_mix=None, prefill=0.05,
+              prefill_values=None, station_idx=0, fund=DEFAULT_FUND, seed=0):
+    """
+    Vytvoří syntetické oddělení
+    days - délka měsíce (default podle kalendáře)
+    prefill - podíl dnů, které má sestra předvyplněné (DOV/K/R...)
+    station_idx - pozice staniční v seznamu sester
+    Vrací slovník se vstupy solverů (employees, fixed, fixed_hours, days, station_idx...)
+    """
+    rng = random.Random(seed)
+    days = days or calendar.monthrange(year, month)[1]
+    uvazek_mix = uvazek_mix or DEFAULT_UVAZEK_MIX
+    prefill_values = prefill_values or DEFAULT_PREFILL_VALUES
+    uvazky, weights = zip(*uvazek_mix.items())
+    values, value_weights = zip(*prefill_values.items())
+
+    employees = []
+    fixed = [[None] * days for _ in range(nurses)]
+    fixed_hours = [0.0] * nurses
+
+    for i in range(nurses):
+        uvazek = rng.choices(uvazky, weights)[0]
+        employees.append({
+            'row': i + 3,
+            'name': f"Sestra {i + 1}",
+            'uvazek': uvazek,
+            'typ': "1S",
+            'target_hours': fund * uvazek,
+        })
+        if i == station_idx:
+            continue
+        for di in range(days):
+            if rng.random() < prefill:
+                val = rng.choices(values, value_weights)[0]
+                fixed[i][di] = val
+                fixed_hours[i] += HOURS_FIXED.get(val, 0.0)
+
+    # Staniční má R po-pá jako v prepare_month
+    first_weekday = datetime.date(year, month, 1).weekday()
+    for di in range(days):
+        if (first_weekday + di) % 7 >= 5:
+            continue
+        fixed[station_idx][di] = "R"
+        fixed_hours[station_idx] += HOURS_FIXED["R"]
+
+    return {
+        "year": year,
+        "month": month,
+        "days": days,
+        "employees": employees,
+        "fixed": fixed,
+        "fixed_hours": fixed_hours,
+        "station_idx": station_idx,
+    }
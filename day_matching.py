@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+"""
+Přiřazení slotů jednoho dne sestrám jako min-cost matching (maďarská metoda)
+Řádky = sloty (D/N), sloupce = kandidátky, O(n²·m)
+"""
+
+# Cena za nepřípustnou dvojici (porušení hard pravidla)
+FORBIDDEN = 1e9
+# Cena za neobsazený slot - vždy lepší než porušit pravidlo
+UNFILLED = 1e6
+
+
+def min_cost_assignment(cost):
+    """
+    Maďarská metoda pro obdélníkovou matici n×m (n <= m)
+    Vrací pro každý řádek index přiřazeného sloupce
+    """
+    n = len(cost)
+    m = len(cost[0]) if n else 0
+    if n == 0:
+        return []
+
+    u = [0.0] * (n + 1)
+    v = [0.0] * (m + 1)
+    p = [0] * (m + 1)
+    way = [0] * (m + 1)
+
+    for i in range(1, n + 1):
+        p[0] = i
+        j0 = 0
+        minv = [float("inf")] * (m + 1)
+        used = [False] * (m + 1)
+        while True:
+            used[j0] = True
+            i0 = p[j0]
+            row = cost[i0 - 1]
+            delta = float("inf")
+            j1 = 0
+            for j in range(1, m + 1):
+                if used[j]:
+                    continue
+                cur = row[j - 1] - u[i0] - v[j]
+                if cur < minv[j]:
+                    minv[j] = cur
+                    way[j] = j0
+                if minv[j] < delta:
+                    delta = minv[j]
+                    j1 = j
+            for j in range(m + 1):
+                if used[j]:
+                    u[p[j]] += delta
+                    v[j] -= delta
+                else:
+                    minv[j] -= delta
+            j0 = j1
+            if p[j0] == 0:
+                break
+
+        # Prohoď podél nalezené cesty
+        while True:
+            j1 = way[j0]
+            p[j0] = p[j1]
+            j0 = j1
+            if j0 == 0:
+                break
+
+    result = [None] * n
+    for j in range(1, m + 1):
+        if p[j]:
+            result[p[j] - 1] = j - 1
+    return result
+
+
+def match_day(slots, candidates, cost_fn):
+    """
+    Přiřadí sloty dne kandidátkám s minimální celkovou cenou
+    cost_fn(i, shift) vrací cenu nebo None, pokud je dvojice nepřípustná
+    Vrací seznam (slot_idx, osoba) - neobsazené sloty v něm chybí
+    """
+    if not slots:
+        return []
+
+    # Pro každý slot jeden "prázdný" sloupec, takže řešení existuje vždy
+    cost = []
+    for shift in slots:
+        row = []
+        for i in candidates:
+            c = cost_fn(i, shift)
+            row.append(FORBIDDEN if c is None else c)
+        row.extend([UNFILLED] * len(slots))
+        cost.append(row)
+
+    pairs = []
+    for slot_idx, col in enumerate(min_cost_assignment(cost)):
+        if col < len(candidates) and cost[slot_idx][col] < FORBIDDEN:
+            pairs.append((slot_idx, candidates[col]))
+    return pairs
@@ -0,0 +1,211 @@
+# -*- coding: utf-8 -*-
+"""
+Forward checking pro backtracking plánovač (run_planner)
+
+Pro každý den držíme pool osob, které tam ještě můžou dostat D a N
+(bitová maska přes osoby). Po každém přiřazení se přepočítají jen dny
+v okolí, kterých se změna týká, a větev se zařízne hned, jak některý
+budoucí den nemá dost kandidátů. Dny se plní od nejvíc omezeného (MRV).
+"""
+
+import numpy as np
+
+import shift_rules
+from shift_rules import ShiftState, CalendarCounters
+
+# Limit uzlů na jeden pokus - pak zkusíme jiný seed
+MAX_NODES = 20000
+
+
+class SearchBudgetExceeded(Exception):
+    pass
+
+
+def iter_bits(mask):
+    """Indexy nastavených bitů"""
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+class ForwardCheckingSearch:
+    """
+    Jeden pokus o nalezení rozvrhu
+    schedule - předvyplněný Schedule, pokus do něj zapisuje (předej kopii)
+    day_index - víkendy a svátky (work_calendar.day_types) pro pořadí kandidátů
+    solve() vrací (assign, hours) nebo None
+    """
+
+    def __init__(self, schedule, fixed_hours, target, station_idx, rng,
+                 max_consec, req_d, req_n, shift_hours, max_nodes=MAX_NODES, day_index=None):
+        self.P = schedule.people
+        self.D = schedule.days
+        self.schedule = schedule
+        self.hours = fixed_hours[:]
+        self.target = target
+        self.station_idx = station_idx
+        self.rng = rng
+        self.shift_hours = shift_hours
+        self.max_consec = max_consec
+        self.max_nodes = max_nodes
+        # Kolik dnů kolem změny může změnit příslušnost do poolů - úsek směn
+        # (max_consec + 1), s limitem nocí celé 7denní okno (6 dnů na každou stranu)
+        self.span = max_consec + 1
+        if shift_rules.MAX_NIGHTS_PER_7_DAYS is not None:
+            self.span = max(self.span, 6)
+        self.state = ShiftState(schedule, max_consec)
+        self.calendar = CalendarCounters(schedule, day_index) if day_index else None
+        self.everyone = np.arange(self.P)
+
+        # Statistiky pro ladění
+        self.nodes = 0
+        self.backtracks = 0
+        self.depth = 0
+        self.max_depth = 0
+
+        # Kolik D a N ještě chybí v každém dni (z počítadel rozvrhu)
+        need_d, need_n = schedule.needed(req_d, req_n)
+        self.need = {"D": need_d.tolist(), "N": need_n.tolist()}
+
+        # Pooly kandidátů a zákazy (osoba už v téhle větvi odmítnuta)
+        self.pool = {"D": [0] * self.D, "N": [0] * self.D}
+        self.banned = {"D": [0] * self.D, "N": [0] * self.D}
+        for i in range(self.P):
+            self._refresh(i, 0, self.D - 1)
+
+    def _refresh(self, i, lo, hi):
+        """Přepočítá příslušnost osoby i do poolů ve dnech lo..hi"""
+        if i == self.station_idx:
+            return
+        bit = 1 << i
+        for di in range(max(0, lo), min(self.D - 1, hi) + 1):
+            for shift in ("D", "N"):
+                if self.state.fits(i, di, shift):
+                    self.pool[shift][di] |= bit
+                else:
+                    self.pool[shift][di] &= ~bit
+
+    def _available(self, di, shift):
+        return self.pool[shift][di] & ~self.banned[shift][di]
+
+    def _slack(self, di):
+        """
+        Rezerva dne - kolik kandidátů přebývá (záporná = den nejde pokrýt)
+        Vrací (rezerva, nejvíc omezená směna)
+        """
+        need_d, need_n = self.need["D"][di], self.need["N"][di]
+        avail_d, avail_n = self._available(di, "D"), self._available(di, "N")
+        union = (avail_d | avail_n).bit_count() - need_d - need_n
+        slack_d = avail_d.bit_count() - need_d if need_d else None
+        slack_n = avail_n.bit_count() - need_n if need_n else None
+
+        if slack_n is not None and (slack_d is None or slack_n <= slack_d):
+            return min(union, slack_n), "N"
+        return min(union, slack_d), "D"
+
+    def _day_ok(self, di):
+        if not self.need["D"][di] and not self.need["N"][di]:
+            return True
+        return self._slack(di)[0] >= 0
+
+    def _select(self):
+        """Nejvíc omezený nedokončený den (MRV) a jeho směna"""
+        best = None
+        for di in range(self.D):
+            if not self.need["D"][di] and not self.need["N"][di]:
+                continue
+            slack, shift = self._slack(di)
+            if best is None or slack < best[0]:
+                best = (slack, di, shift)
+        return best
+
+    def _score(self, i):
+        """Stejné hodnocení jako score_person - menší je lepší"""
+        future_hours = self.hours[i] + self.shift_hours
+        diff = abs(future_hours - self.target[i])
+        if future_hours > self.target[i]:
+            diff *= 10.0
+        return diff + self.rng.uniform(-0.01, 0.01)
+
+    def _day_penalty(self, di):
+        """Víkendy a svátky v hodinách pro všechny osoby (stejné pro celý den)"""
+        cost = self.shift_hours * self.calendar.penalty(self.everyone, di)
+        return np.broadcast_to(cost, self.P).tolist()
+
+    def _place(self, i, di, shift):
+        self.schedule.place(i, di, shift)
+        self.state.assign(i, di, shift)
+        if self.calendar:
+            self.calendar.assign(i, di)
+        self.hours[i] += self.shift_hours
+        self.need[shift][di] -= 1
+        self.depth += 1
+        self._refresh(i, di - self.span, di + self.span)
+
+    def _remove(self, i, di, shift):
+        self.schedule.remove(i, di)
+        self.state.unassign(i, di, shift)
+        if self.calendar:
+            self.calendar.unassign(i, di)
+        self.hours[i] -= self.shift_hours
+        self.need[shift][di] += 1
+        self.depth -= 1
+        self._refresh(i, di - self.span, di + self.span)
+
+    def _consistent(self, di):
+        """Forward check - všechny dny v okolí změny musí jít ještě pokrýt"""
+        for dj in range(max(0, di - self.span), min(self.D, di + self.span + 1)):
+            if not self._day_ok(dj):
+                return False
+        return True
+
+    def _search(self):
+        self.nodes += 1
+        if self.nodes > self.max_nodes:
+            raise SearchBudgetExceeded()
+        if self.depth > self.max_depth:
+            self.max_depth = self.depth
+
+        selected = self._select()
+        if selected is None:
+            return True
+
+        slack, di, shift = selected
+        if slack < 0:
+            return False
+
+        if self.calendar and self.calendar.special(di):
+            day_penalty = self._day_penalty(di)
+            candidates = sorted(iter_bits(self._available(di, shift)),
+                                key=lambda i: self._score(i) + day_penalty[i])
+        else:
+            candidates = sorted(iter_bits(self._available(di, shift)), key=self._score)
+        banned_here = 0
+        try:
+            for i in candidates:
+                self._place(i, di, shift)
+                if self._consistent(di) and self._search():
+                    return True
+                self._remove(i, di, shift)
+                self.backtracks += 1
+
+                # Stejná osoba na stejném slotu už v sourozeneckých větvích nemá smysl
+                self.banned[shift][di] |= 1 << i
+                banned_here |= 1 << i
+                if not self._day_ok(di):
+                    break
+            return False
+        finally:
+            self.banned[shift][di] &= ~banned_here
+
+    def solve(self):
+        # Některý den nejde pokrýt už z předvyplněných hodnot
+        if not all(self._day_ok(di) for di in range(self.D)):
+            return None
+        try:
+            if self._search():
+                return self.schedule.to_rows(), self.hours
+        except SearchBudgetExceeded:
+            pass
+        return None
@@ -0,0 +1,184 @@
+# -*- coding: utf-8 -*-
+"""
+Lokální vylepšení hotového rozvrhu (simulované žíhání)
+
+Tahy:
+- předání směny: D nebo N v jednom dni přejde z jedné sestry na druhou
+- výměna nočních: dvě sestry si prohodí N mezi dvěma dny
+
+Hard pravidla se hlídají přes ShiftState.fits, cílová funkce se počítá
+inkrementálně - tah mění hodiny nejvýš dvou osob. S day_index tahy navíc
+nesmí sestře vzít potřebný volný víkend ani zhoršit rozložení svátků.
+"""
+
+import math
+import random
+import time
+
+from shift_rules import ShiftState, CalendarCounters
+
+# Přesčas je horší než chybějící hodiny
+OVERTIME_WEIGHT = 2.0
+# Teplota žíhání (v jednotkách cílové funkce)
+START_TEMP = 200.0
+END_TEMP = 0.5
+# Jak často kontrolovat čas
+TIME_CHECK_EVERY = 1000
+
+
+def penalty(diff):
+    """Příspěvek jedné osoby - čtverec odchylky od targetu, přesčas je dražší"""
+    if diff > 0:
+        return OVERTIME_WEIGHT * diff * diff
+    return diff * diff
+
+
+def improve_schedule(assign, hours, fixed, target, station_idx, max_consec, shift_hours,
+                     time_limit=None, max_iters=None, seed=None, history=None, day_index=None):
+    """
+    Vylepší rozvrh na místě (assign, hours se mění)
+    Končí po time_limit sekundách nebo max_iters tazích - co nastane dřív
+    history - konec předchozího měsíce (viz ShiftState)
+    day_index - víkendy a svátky měsíce (viz CalendarCounters)
+    Vrací slovník se statistikou
+    """
+    if not time_limit and not max_iters:
+        return None
+
+    P = len(assign)
+    D = len(assign[0]) if assign else 0
+    rng = random.Random(seed)
+    state = ShiftState(assign, max_consec, history)
+    cal = CalendarCounters(assign, day_index) if day_index else None
+    people = [i for i in range(P) if i != station_idx]
+
+    # Kdo drží přesunutelnou směnu (ne předvyplněnou) v každém dni
+    holders = {"D": [[] for _ in range(D)], "N": [[] for _ in range(D)]}
+    for i in people:
+        for di in range(D):
+            val = assign[i][di]
+            if val in ("D", "N") and fixed[i][di] is None:
+                holders[val][di].append(i)
+
+    cost = sum(penalty(hours[i] - target[i]) for i in people)
+    start_cost = cost
+    iterations = accepted = 0
+    started = time.monotonic()
+    progress = 0.0
+    temp = START_TEMP
+
+    def accept(delta):
+        return delta <= 0 or rng.random() < math.exp(-delta / temp)
+
+    def calendar_fits(gain, lose, di):
+        """gain dostane směnu v di, kterou lose už odevzdal (počítadla bez ní)"""
+        if cal.breaks_weekend(gain, di):
+            return False
+        return not cal.holiday[di] or cal.holiday_shifts[gain] <= cal.holiday_shifts[lose]
+
+    while True:
+        if max_iters and iterations >= max_iters:
+            break
+        if iterations % TIME_CHECK_EVERY == 0:
+            elapsed = time.monotonic() - started
+            if time_limit and elapsed >= time_limit:
+                break
+            progress = max(iterations / max_iters if max_iters else 0.0,
+                           elapsed / time_limit if time_limit else 0.0)
+            temp = START_TEMP * (END_TEMP / START_TEMP) ** progress
+        iterations += 1
+
+        if rng.random() < 0.7:
+            # Předání směny v jednom dni z a na b
+            di = rng.randrange(D)
+            shift = "D" if rng.random() < 0.5 else "N"
+            day_holders = holders[shift][di]
+            if not day_holders:
+                continue
+            k = rng.randrange(len(day_holders))
+            a = day_holders[k]
+            b = rng.choice(people)
+            if a == b:
+                continue
+
+            # Odebrání nikdy neporuší pravidla, stačí zkontrolovat b
+            state.unassign(a, di, shift)
+            if cal:
+                cal.unassign(a, di)
+            if not state.fits(b, di, shift) or (cal and not calendar_fits(b, a, di)):
+                state.assign(a, di, shift)
+                if cal:
+                    cal.assign(a, di)
+                continue
+
+            delta = (penalty(hours[a] - shift_hours - target[a]) - penalty(hours[a] - target[a]) +
+                     penalty(hours[b] + shift_hours - target[b]) - penalty(hours[b] - target[b]))
+            if not accept(delta):
+                state.assign(a, di, shift)
+                if cal:
+                    cal.assign(a, di)
+                continue
+
+            state.assign(b, di, shift)
+            if cal:
+                cal.assign(b, di)
+            assign[a][di] = None
+            assign[b][di] = shift
+            hours[a] -= shift_hours
+            hours[b] += shift_hours
+            day_holders[k] = b
+        else:
+            # Výměna nočních: a má N v d1, b v d2 -> a v d2, b v d1 (hodiny se nemění)
+            d1, d2 = rng.randrange(D), rng.randrange(D)
+            if d1 == d2 or not holders["N"][d1] or not holders["N"][d2]:
+                continue
+            k1 = rng.randrange(len(holders["N"][d1]))
+            k2 = rng.randrange(len(holders["N"][d2]))
+            a, b = holders["N"][d1][k1], holders["N"][d2][k2]
+            if a == b:
+                continue
+
+            state.unassign(a, d1, "N")
+            state.unassign(b, d2, "N")
+            if cal:
+                cal.unassign(a, d1)
+                cal.unassign(b, d2)
+            ok = state.fits(a, d2, "N") and state.fits(b, d1, "N")
+            if ok and cal:
+                ok = not (cal.breaks_weekend(a, d2) or cal.breaks_weekend(b, d1))
+                # Svátek se přesouvá jen k tomu, kdo jich má méně
+                if ok and cal.holiday[d1] != cal.holiday[d2]:
+                    gain, lose = (a, b) if cal.holiday[d2] else (b, a)
+                    ok = cal.holiday_shifts[gain] <= cal.holiday_shifts[lose]
+            if not ok:
+                state.assign(a, d1, "N")
+                state.assign(b, d2, "N")
+                if cal:
+                    cal.assign(a, d1)
+                    cal.assign(b, d2)
+                continue
+
+            delta = 0.0
+            state.assign(a, d2, "N")
+            state.assign(b, d1, "N")
+            if cal:
+                cal.assign(a, d2)
+                cal.assign(b, d1)
+            assign[a][d1], assign[a][d2] = None, "N"
+            assign[b][d2], assign[b][d1] = None, "N"
+            holders["N"][d1][k1] = b
+            holders["N"][d2][k2] = a
+
+        cost += delta
+        accepted += 1
+
+    info = {
+        "iterations": iterations,
+        "accepted": accepted,
+        "cost_before": round(start_cost, 1),
+        "cost_after": round(cost, 1),
+        "seconds": round(time.monotonic() - started, 2),
+    }
+    print(f"✓ Lokální vylepšení: {iterations} tahů ({accepted} přijato), "
+          f"cena {start_cost:.0f} -> {cost:.0f}")
+    return info
@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+"""
+Prometheus metriky plánovače (GET /metrics)
+Doba jednotlivých kroků plánování, volání Sheets API a statistiky solveru
+
+Pro víc gunicorn workerů nastav PROMETHEUS_MULTIPROC_DIR (prázdný adresář),
+/metrics pak sečte hodnoty ze všech workerů
+"""
+
+import os
+import time
+from contextlib import contextmanager
+
+from prometheus_client import (CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter,
+                               Histogram, generate_latest, multiprocess)
+
+# Kroky plánování jsou od milisekund (detekce struktury) po desítky sekund (solver)
+STAGE_BUCKETS = (0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+STAGE_SECONDS = Histogram(
+    'planner_stage_seconds', 'Doba kroku plánování',
+    ['stage'], buckets=STAGE_BUCKETS)
+SHEETS_CALLS = Counter(
+    'planner_sheets_api_calls_total', 'Volání Google Sheets API',
+    ['method'])
+SHEETS_BYTES = Counter(
+    'planner_sheets_bytes_total', 'Data přenesená ze/do Sheets (JSON hodnot)',
+    ['direction'])
+SOLVER_RESTARTS = Counter(
+    'planner_solver_restarts_total', 'Běhy solveru (seedy multi-startu a opakované pokusy)')
+SOLVER_NODES = Counter(
+    'planner_solver_nodes_total', 'Uzly prohledávání backtrackingu')
+SOLVER_BACKTRACKS = Counter(
+    'planner_solver_backtracks_total', 'Návraty backtrackingu')
+UNFILLED_SLOTS = Counter(
+    'planner_unfilled_slots_total', 'Neobsazené sloty v naplánovaných rozvrzích')
+SHEETS_THROTTLE_SECONDS = Counter(
+    'planner_sheets_throttle_seconds_total', 'Čekání na kvóty Sheets API',
+    ['kind'])
+SHEETS_RETRIES = Counter(
+    'planner_sheets_retries_total', 'Opakovaná volání Sheets API podle chyby',
+    ['status'])
+CACHE_REQUESTS = Counter(
+    'planner_cache_requests_total', 'Dotazy do cache výsledků',
+    ['result'])
+REVISION_CHECKS = Counter(
+    'planner_sheets_revision_checks_total', 'Kontroly revize sešitu před čtením',
+    ['result'])
+
+
+@contextmanager
+def stage(name):
+    """with stage("solve"): ... - změří dobu kroku"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGE_SECONDS.labels(name).observe(time.perf_counter() - started)
+
+
+def observe_api_call(method, bytes_read=0, bytes_written=0):
+    SHEETS_CALLS.labels(method).inc()
+    if bytes_read:
+        SHEETS_BYTES.labels('read').inc(bytes_read)
+    if bytes_written:
+        SHEETS_BYTES.labels('written').inc(bytes_written)
+
+
+def observe_solver(info):
+    """Statistiky z výsledku solve_multistart"""
+    SOLVER_RESTARTS.inc(info.get('attempts') or info.get('finished', 0))
+    SOLVER_NODES.inc(info.get('nodes', 0))
+    SOLVER_BACKTRACKS.inc(info.get('backtracks', 0))
+    UNFILLED_SLOTS.inc(info.get('unfilled', 0))
+
+
+def render():
+    """Text pro /metrics a jeho content type"""
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
@@ -0,0 +1,160 @@
+# -*- coding: utf-8 -*-
+"""
+Paralelní multi-start - stejný solver s různými seedy v poolu procesů
+Vrací nejférovější nalezený rozvrh v rámci časového limitu
+"""
+
+import os
+import time
+import inspect
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+# Kolik seedů zkusit a jak dlouho (s) nejvýš čekat
+DEFAULT_STARTS = os.cpu_count() or 1
+# Víc seedů na jedno plánování se nespustí (starts z requestu se ořízne)
+MAX_STARTS = 64
+DEFAULT_TIME_BUDGET = 10.0
+
+_lock = threading.Lock()
+_state = {"pid": None, "executor": None}
+
+
+def _get_executor():
+    """Pool procesů na worker - forkserver, protože v procesu běží i vlákna jobů"""
+    with _lock:
+        if _state["pid"] != os.getpid():
+            _state["pid"] = os.getpid()
+            _state["executor"] = ProcessPoolExecutor(
+                max_workers=DEFAULT_STARTS,
+                mp_context=multiprocessing.get_context("forkserver"),
+            )
+        return _state["executor"]
+
+
+def days_filled(assign, req_d, req_n):
+    """Počet dní s plně obsazenými D i N"""
+    filled = 0
+    for di in range(len(assign[0]) if assign else 0):
+        d_count = sum(1 for row in assign if row[di] == "D")
+        n_count = sum(1 for row in assign if row[di] == "N")
+        filled += d_count >= req_d and n_count >= req_n
+    return filled
+
+
+def schedule_score(assign, hours, target, station_idx, req_d, req_n):
+    """
+    Hodnocení rozvrhu - menší je lepší
+    (počet neobsazených slotů, rozptyl hodin - targetu mezi sestrami)
+    """
+    unfilled = 0
+    for di in range(len(assign[0]) if assign else 0):
+        d_count = sum(1 for row in assign if row[di] == "D")
+        n_count = sum(1 for row in assign if row[di] == "N")
+        unfilled += max(0, req_d - d_count) + max(0, req_n - n_count)
+
+    # Staniční má jen R, do férovosti ji nepočítáme
+    diffs = [h - t for i, (h, t) in enumerate(zip(hours, target)) if i != station_idx]
+    spread = max(diffs) - min(diffs) if diffs else 0.0
+    return unfilled, spread
+
+
+# Počítadla, která solvery s parametrem stats vyplňují (viz run_planner)
+# - sčítají se přes seedy, max_depth se bere největší
+STAT_KEYS = ("attempts", "nodes", "backtracks")
+
+
+def _run_seed(solver, args, seed):
+    stats = {}
+    started = time.perf_counter()
+    if "stats" in inspect.signature(solver).parameters:
+        result = solver(*args, seed=seed, stats=stats)
+    else:
+        result = solver(*args, seed=seed)
+    stats["seconds"] = time.perf_counter() - started
+    return seed, result, stats
+
+
+def solve_multistart(solver, args, seeds, target, station_idx, req_d, req_n,
+                     time_budget=DEFAULT_TIME_BUDGET, parallel=True, progress=None):
+    """
+    Spustí solver(*args, seed=s) pro každý seed a vrátí nejlepší výsledek
+    parallel=False - seedy běží postupně v tomto procesu (profilování)
+    progress(event, data) - po každém dokončeném seedu událost "solver"
+    (pořadí, seed, vyplněné dny, nejlepší neobsazeno / rozptyl zatím)
+    Výsledek: (assign, hours, info) nebo None, pokud žádný seed neuspěl
+    """
+    seeds = list(seeds)
+    started = time.monotonic()
+    best = None
+    finished = 0
+    totals = {}
+    seed_seconds = []
+
+    def consider(seed, result, stats):
+        nonlocal best, finished
+        finished += 1
+        seed_seconds.append(round(stats["seconds"], 3))
+        for key in STAT_KEYS:
+            if key in stats:
+                totals[key] = totals.get(key, 0) + stats[key]
+        if "max_depth" in stats:
+            totals["max_depth"] = max(totals.get("max_depth", 0), stats["max_depth"])
+        if result:
+            assign, hours = result
+            score = schedule_score(assign, hours, target, station_idx, req_d, req_n)
+            if best is None or score < best[0]:
+                best = (score, seed, assign, hours)
+        if progress:
+            progress("solver", {
+                "restart": finished,
+                "starts": len(seeds),
+                "seed": seed,
+                "solved": bool(result),
+                "days_filled": days_filled(result[0], req_d, req_n) if result else 0,
+                "best_unfilled": best[0][0] if best else None,
+                "best_spread": round(best[0][1], 2) if best else None,
+            })
+
+    if len(seeds) <= 1 or DEFAULT_STARTS <= 1 or not parallel:
+        # Jedno jádro (nebo profilování) - seedy běží postupně v tomto procesu
+        for seed in seeds:
+            consider(*_run_seed(solver, args, seed))
+            if best and time.monotonic() - started > time_budget:
+                break
+    else:
+        executor = _get_executor()
+        pending = {executor.submit(_run_seed, solver, args, seed) for seed in seeds}
+        while pending:
+            remaining = time_budget - (time.monotonic() - started)
+            if remaining > 0:
+                timeout = remaining
+            elif best is None:
+                # Limit vypršel, ale zatím nic nemáme - čekáme na první řešení
+                timeout = None
+            else:
+                break
+            done, pending = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            for fut in done:
+                consider(*fut.result())
+        for fut in pending:
+            fut.cancel()
+
+    if best is None:
+        return None
+
+    (unfilled, spread), seed, assign, hours = best
+    info = {
+        "seed": seed,
+        "starts": len(seeds),
+        "finished": finished,
+        "unfilled": unfilled,
+        "spread": round(spread, 2),
+        "seconds": round(time.monotonic() - started, 2),
+        "seed_seconds": seed_seconds,
+    }
+    info.update(totals)
+    print(f"✓ Multi-start: {finished}/{len(seeds)} seedů, nejlepší seed {seed}, "
+          f"neobsazeno {unfilled}, rozptyl {spread:.1f}h")
+    return assign, hours, info
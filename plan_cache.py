@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+"""
+Cache výsledků plánování sdílená mezi workery (SQLite soubor)
+Klíč je hash vstupů solveru (předvyplněné, úvazky, fondy, parametry, seed),
+takže opakované plánování nezměněného listu solver přeskočí
+Stará a nejdéle nepoužitá data se mažou (TTL + LRU)
+"""
+
+import os
+import json
+import time
+import hashlib
+import sqlite3
+import tempfile
+
+import metrics
+
+CACHE_PATH = os.environ.get('PLAN_CACHE_PATH',
+                            os.path.join(tempfile.gettempdir(), 'planovac_cache.sqlite3'))
+# Jak dlouho (s) výsledek platí
+CACHE_TTL = int(os.environ.get('PLAN_CACHE_TTL', 7 * 24 * 3600))
+# Max počet uložených výsledků (0 = cache vypnutá)
+CACHE_SIZE = int(os.environ.get('PLAN_CACHE_SIZE', 500))
+# Zvýšit při změně solverů - staré výsledky pak přestanou platit
+CACHE_VERSION = 2
+
+
+def _connect():
+    conn = sqlite3.connect(CACHE_PATH, timeout=30)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("CREATE TABLE IF NOT EXISTS results ("
+                 "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+                 "created REAL NOT NULL, used REAL NOT NULL)")
+    return conn
+
+
+def make_key(data):
+    """Hash vstupů - data musí jít převést do JSON"""
+    raw = json.dumps([CACHE_VERSION, data], sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+def get(key):
+    """Vrátí uložený výsledek nebo None (chyba cache plánování nezastaví)"""
+    if CACHE_SIZE <= 0:
+        return None
+    now = time.time()
+    try:
+        conn = _connect()
+        try:
+            with conn:
+                row = conn.execute("SELECT value FROM results WHERE key = ? AND created > ?",
+                                   (key, now - CACHE_TTL)).fetchone()
+                if row is None:
+                    metrics.CACHE_REQUESTS.labels('miss').inc()
+                    return None
+                conn.execute("UPDATE results SET used = ? WHERE key = ?", (now, key))
+        finally:
+            conn.close()
+    except sqlite3.Error as e:
+        print(f"⚠️  Cache nedostupná: {e}")
+        return None
+    metrics.CACHE_REQUESTS.labels('hit').inc()
+    return json.loads(row[0])
+
+
+def put(key, value):
+    """Uloží výsledek a promaže staré / nejdéle nepoužité záznamy"""
+    if CACHE_SIZE <= 0:
+        return
+    now = time.time()
+    try:
+        conn = _connect()
+        try:
+            with conn:
+                conn.execute("INSERT OR REPLACE INTO results (key, value, created, used) "
+                             "VALUES (?, ?, ?, ?)",
+                             (key, json.dumps(value, ensure_ascii=False), now, now))
+                conn.execute("DELETE FROM results WHERE created <= ?", (now - CACHE_TTL,))
+                conn.execute("DELETE FROM results WHERE key NOT IN "
+                             "(SELECT key FROM results ORDER BY used DESC LIMIT ?)",
+                             (CACHE_SIZE,))
+        finally:
+            conn.close()
+    except sqlite3.Error as e:
+        print(f"⚠️  Cache nedostupná: {e}")
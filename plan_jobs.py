@@ -0,0 +1,132 @@
+# -*- coding: utf-8 -*-
+"""
+Asynchronní plánovací joby
+POST /plan s "async": true vrátí job id, výpočet běží v omezeném poolu vláken
+Stav jobu je soubor v JOB_DIR (jako náhledy v plan_previews), takže
+GET /plan/<job_id> odpoví kterýkoli gunicorn worker, ne jen ten, který job spustil
+"""
+
+import os
+import re
+import json
+import time
+import uuid
+import tempfile
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+
+# Kolik plánování smí běžet současně v jednom workeru
+MAX_WORKERS = int(os.environ.get('PLAN_WORKERS', 2))
+JOB_DIR = os.environ.get('PLAN_JOB_DIR',
+                         os.path.join(tempfile.gettempdir(), 'planovac_jobs'))
+# Jak dlouho (s) od poslední změny držíme stav jobu
+JOB_TTL = 3600
+
+_lock = threading.Lock()
+_state = {"pid": None, "executor": None}
+
+
+def _get_executor():
+    """Pool vláken - po forku (gunicorn) se vytvoří znovu"""
+    if _state["pid"] != os.getpid():
+        _state["pid"] = os.getpid()
+        _state["executor"] = ThreadPoolExecutor(max_workers=MAX_WORKERS,
+                                                thread_name_prefix="plan-job")
+    return _state["executor"]
+
+
+def _path(job_id):
+    """Cesta ke stavu jobu nebo None (id je jen hex, žádné cesty z requestu)"""
+    if not re.fullmatch(r"[0-9a-f]{32}", job_id or ""):
+        return None
+    return os.path.join(JOB_DIR, f"{job_id}.json")
+
+
+def _save(job):
+    """Zapíše stav jobu atomicky (čtenář nikdy nevidí půlku souboru), volá se pod _lock"""
+    path = _path(job["id"])
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(job, f, ensure_ascii=False)
+    os.replace(tmp, path)
+
+
+def _cleanup():
+    """Smaže stavy jobů nezměněné déle než JOB_TTL"""
+    now = time.time()
+    for filename in os.listdir(JOB_DIR):
+        path = os.path.join(JOB_DIR, filename)
+        try:
+            if now - os.path.getmtime(path) > JOB_TTL:
+                os.remove(path)
+        except OSError:
+            pass
+
+
+def _run(job, fn, args, kwargs):
+    def progress(event, data):
+        if event in ("stage", "month", "solver"):
+            with _lock:
+                job[event] = data
+                _save(job)
+
+    with _lock:
+        job["state"] = "running"
+        job["started"] = time.time()
+        _save(job)
+
+    try:
+        result = fn(*args, progress=progress, **kwargs)
+        with _lock:
+            job["state"] = "done"
+            job["result"] = result
+    except Exception as e:
+        error_details = traceback.format_exc()
+        print(f"CHYBA v jobu {job['id']}: {error_details}")
+        with _lock:
+            job["state"] = "error"
+            job["error"] = {"message": str(e), "details": error_details}
+    finally:
+        with _lock:
+            job["finished"] = time.time()
+            _save(job)
+
+
+def submit(fn, *args, **kwargs):
+    """
+    Zařadí plánování do fronty a hned vrátí job id
+    fn musí přijímat keyword argument progress(event, data)
+    """
+    os.makedirs(JOB_DIR, exist_ok=True)
+    with _lock:
+        executor = _get_executor()
+        _cleanup()
+        job = {
+            "id": uuid.uuid4().hex,
+            "state": "queued",
+            "stage": None,
+            "month": None,
+            "solver": None,
+            "created": time.time(),
+            "started": None,
+            "finished": None,
+            "result": None,
+            "error": None,
+        }
+        _save(job)
+
+    executor.submit(_run, job, fn, args, kwargs)
+    return job["id"]
+
+
+def get_job(job_id):
+    """Vrátí stav jobu (z kteréhokoli workeru) nebo None"""
+    path = _path(job_id)
+    if path is None:
+        return None
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
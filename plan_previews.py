@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+"""
+Náhledy plánu (POST /plan s "dry_run") - naplánovaný rozvrh se nezapíše,
+uloží se pod id a POST /plan/commit ho později zapíše přesně tak, jak byl
+Náhledy jsou soubory v PREVIEW_DIR, takže je vidí všechny gunicorn workery
+"""
+
+import os
+import re
+import json
+import time
+import uuid
+import tempfile
+
+PREVIEW_DIR = os.environ.get('PLAN_PREVIEW_DIR',
+                             os.path.join(tempfile.gettempdir(), 'planovac_previews'))
+# Jak dlouho (s) náhled platí
+PREVIEW_TTL = int(os.environ.get('PLAN_PREVIEW_TTL', 24 * 3600))
+
+
+class PreviewNotFound(LookupError):
+    """Náhled neexistuje, vypršel nebo už byl zapsán"""
+
+
+class PreviewOutdated(RuntimeError):
+    """List se od náhledu změnil - náhled nejde zapsat beze změny"""
+
+
+def _path(preview_id):
+    """Cesta k náhledu nebo None (id je jen hex, žádné cesty z requestu)"""
+    if not re.fullmatch(r"[0-9a-f]{32}", preview_id or ""):
+        return None
+    return os.path.join(PREVIEW_DIR, f"{preview_id}.json")
+
+
+def _cleanup():
+    """Smaže náhledy starší než PREVIEW_TTL"""
+    now = time.time()
+    for filename in os.listdir(PREVIEW_DIR):
+        path = os.path.join(PREVIEW_DIR, filename)
+        try:
+            if now - os.path.getmtime(path) > PREVIEW_TTL:
+                os.remove(path)
+        except OSError:
+            pass
+
+
+def save(preview):
+    """Uloží náhled (slovník serializovatelný do JSON), vrací jeho id"""
+    os.makedirs(PREVIEW_DIR, exist_ok=True)
+    _cleanup()
+    preview_id = uuid.uuid4().hex
+    path = _path(preview_id)
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(preview, f, ensure_ascii=False)
+    os.replace(tmp, path)
+    return preview_id
+
+
+def load(preview_id):
+    """Uložený náhled, jinak PreviewNotFound"""
+    path = _path(preview_id)
+    try:
+        if path is None or time.time() - os.path.getmtime(path) > PREVIEW_TTL:
+            raise FileNotFoundError(preview_id)
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        raise PreviewNotFound(f"Náhled {preview_id} neexistuje nebo už byl zapsán") from None
+
+
+def discard(preview_id):
+    """Zapsaný náhled se smaže - podruhé ho zapsat nejde"""
+    path = _path(preview_id)
+    try:
+        if path:
+            os.remove(path)
+    except OSError:
+        pass
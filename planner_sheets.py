@@ -4,14 +4,17 @@ Plánovač služeb V2 - Nový od základu
 Priorita: VYROVNANÉ HODINY
 """
 
-import os
-import json
 import calendar
 import datetime
 import random
 import unicodedata
-import gspread
-from google.oauth2.service_account import Credentials
+from sheets_client import read_sheets
+from sheets_backend import default_backend, READ_ERRORS
+from sheets_writer import SheetWriter
+from work_calendar import day_types
+from schedule import Schedule
+from fc_search import ForwardCheckingSearch
+from multistart import solve_multistart, DEFAULT_STARTS, MAX_STARTS, DEFAULT_TIME_BUDGET
 
 # Konfigurace
 SPREADSHEET_ID = "1L3isRHcwU9LyTMYyvT24eZk52fVfCHuYupXQLQmRyyg"
@@ -51,22 +54,13 @@ def to_float(v) -> float:
     return float(str(v).replace(",", "."))
 
 
-def connect_to_sheets():
-    """Připojí se k Google Sheets"""
-    scope = [
-        'https://www.googleapis.com/auth/spreadsheets',
-        'https://www.googleapis.com/auth/drive'
-    ]
-    
-    creds_json = os.environ.get('GOOGLE_CREDENTIALS_JSON')
-    if creds_json:
-        creds_dict = json.loads(creds_json)
-        creds = Credentials.from_service_account_info(creds_dict, scopes=scope)
-    else:
-        creds = Credentials.from_service_account_file(CREDENTIALS_FILE, scopes=scope)
-    
-    client = gspread.authorize(creds)
-    return client.open_by_key(SPREADSHEET_ID)
+def connect_to_sheets(backend=None):
+    """
+    Připojí se k Google Sheets
+    backend - volitelně jiný zdroj dat (např. SnapshotBackend, viz sheets_backend)
+    """
+    backend = backend or default_backend(SPREADSHEET_ID, CREDENTIALS_FILE)
+    return backend.open_workbook()
 
 
 def get_month_from_sheet_name(sheet_name: str) -> tuple:
@@ -137,58 +131,64 @@ def load_employees(ws_data, header_row, name_col):
     return employees
 
 
-def load_hours_fund(wb, year, month):
-    """Načte fondy hodin z FONDY_HODIN"""
+def read_plan_data(wb, sheet_name):
+    """Načte plánovací list, FONDY_HODIN a ZAMESTNANCI jedním requestem"""
     try:
-        ws = wb.worksheet("FONDY_HODIN")
-        data = ws.get_all_values()
-        
-        # Hledej řádek pro tento měsíc
-        for row in data[1:]:
-            if len(row) < 3:
-                continue
-            
-            # Zkus najít podle čísla měsíce v datu
-            if "/" in row[0]:
-                try:
-                    parts = row[0].split("/")
-                    date_month = int(parts[1]) if len(parts[0]) <= 2 else int(parts[0])
-                    if date_month == month:
-                        return to_float(row[1]), to_float(row[2])
-                except:
-                    pass
-        
-        print(f"⚠ Nenašel jsem fondy pro měsíc {month}, používám default")
+        return read_sheets(wb, [sheet_name, "FONDY_HODIN", "ZAMESTNANCI"])
+    except READ_ERRORS as e:
+        # Některý z pomocných listů chybí - plánovací list načti samostatně
+        print(f"⚠ Hromadné čtení selhalo: {e}")
+        return read_sheets(wb, [sheet_name])
+
+
+def load_hours_fund(data, year, month):
+    """Načte fondy hodin z dat listu FONDY_HODIN"""
+    if data is None:
+        print("⚠ Chyba při čtení FONDY_HODIN: list nenačten")
         return 176.0, 165.0
     
-    except Exception as e:
-        print(f"⚠ Chyba při čtení FONDY_HODIN: {e}")
-        return 176.0, 165.0
+    # Hledej řádek pro tento měsíc
+    for row in data[1:]:
+        if len(row) < 3:
+            continue
+        
+        # Zkus najít podle čísla měsíce v datu
+        if "/" in row[0]:
+            try:
+                parts = row[0].split("/")
+                date_month = int(parts[1]) if len(parts[0]) <= 2 else int(parts[0])
+                if date_month == month:
+                    return to_float(row[1]), to_float(row[2])
+            except:
+                pass
+    
+    print(f"⚠ Nenašel jsem fondy pro měsíc {month}, používám default")
+    return 176.0, 165.0
 
 
-def load_employee_types(wb, employees):
-    """Načte typy úvazků zaměstnanců"""
-    try:
-        ws = wb.worksheet("ZAMESTNANCI")
-        data = ws.get_all_values()
-        
-        types = {}
-        for row in data[1:]:
-            if len(row) > 3:
-                name = row[0].strip()
-                typ = norm_text(row[3]) if len(row) > 3 else "1S"
-                types[norm_text(name)] = typ
-        
-        return types
-    except Exception as e:
-        print(f"⚠ Chyba při čtení ZAMESTNANCI: {e}")
+def load_employee_types(data, employees):
+    """Načte typy úvazků zaměstnanců z dat listu ZAMESTNANCI"""
+    if data is None:
+        print("⚠ Chyba při čtení ZAMESTNANCI: list nenačten")
         return {}
+    
+    types = {}
+    for row in data[1:]:
+        if len(row) > 3:
+            name = row[0].strip()
+            typ = norm_text(row[3]) if len(row) > 3 else "1S"
+            types[norm_text(name)] = typ
+    
+    return types
 
 
-def plan_shifts_v2(sheet_name: str):
+def plan_shifts_v2(sheet_name: str, options=None, backend=None):
     """
     Hlavní funkce - naplánuje směny pro daný list
+    options - volitelné parametry (seed, starts, time_budget)
+    backend - zdroj dat (default Google Sheets nebo env SHEETS_SNAPSHOT)
     """
+    options = options or {}
     
     print("=" * 60)
     print("Plánovač služeb V2")
@@ -196,7 +196,7 @@ def plan_shifts_v2(sheet_name: str):
     
     # Připoj se
     print(f"\n[1/7] Připojuji se k tabulce...")
-    wb = connect_to_sheets()
+    wb = connect_to_sheets(backend)
     print(f"✓ Připojeno: {wb.title}")
     
     # Zjisti rok a měsíc z názvu listu
@@ -207,8 +207,8 @@ def plan_shifts_v2(sheet_name: str):
     
     # Načti plánovací list
     print(f"\n[3/7] Načítám data...")
-    ws = wb.worksheet(sheet_name)
-    ws_data = ws.get_all_values()
+    sheets_data = read_plan_data(wb, sheet_name)
+    ws_data = sheets_data[sheet_name]
     
     # Detekuj strukturu
     header_row, name_col, start_col = detect_structure(ws_data)
@@ -237,11 +237,11 @@ def plan_shifts_v2(sheet_name: str):
     
     # Načti fondy hodin
     print(f"\n[5/7] Načítám fondy hodin...")
-    fond_1s, fond_05s = load_hours_fund(wb, year, month)
+    fond_1s, fond_05s = load_hours_fund(sheets_data.get("FONDY_HODIN"), year, month)
     print(f"✓ Fond: 1S={fond_1s}h, 0.5S={fond_05s}h")
     
     # Načti typy úvazků
-    emp_types = load_employee_types(wb, employees)
+    emp_types = load_employee_types(sheets_data.get("ZAMESTNANCI"), employees)
     
     # Spočítej cílové hodiny
     for emp in employees:
@@ -283,18 +283,28 @@ def plan_shifts_v2(sheet_name: str):
     
     # SPUSŤ PLÁNOVÁNÍ
     print(f"\n[7/7] Spouštím plánování...")
-    result = run_planner(employees, fixed, fixed_hours, days_in_month, year, month, station_idx)
+    # Každý start má vlastní řadu MAX_TRIES seedů, vybere se nejférovější rozvrh
+    base_seed = int(options.get('seed', year * 1000 + month * 100))
+    starts = min(int(options.get('starts', DEFAULT_STARTS)), MAX_STARTS)
+    result = solve_multistart(
+        run_planner, (employees, fixed, fixed_hours, days_in_month, year, month, station_idx),
+        seeds=[base_seed + k * 1000 for k in range(starts)],
+        target=[e['target_hours'] for e in employees], station_idx=station_idx,
+        req_d=REQ_D, req_n=REQ_N,
+        time_budget=float(options.get('time_budget', DEFAULT_TIME_BUDGET)),
+    )
     
     if not result:
         raise RuntimeError("Nelze najít řešení!")
     
-    assign, hours = result
+    assign, hours, solver_info = result
     
     # ZÁPIS DO TABULKY
     print(f"\n{'=' * 60}")
     print("Zapisuji výsledky...")
     print('=' * 60)
     
+    writer = SheetWriter(wb, sheet_name)
     write_count = 0
     for di, col_num in enumerate(plan_cols):
         for i, emp in enumerate(employees):
@@ -309,10 +319,12 @@ def plan_shifts_v2(sheet_name: str):
             # Zapiš jen pokud je prázdné NEBO je to staniční s R
             new_val = assign[i][di]
             if new_val and (orig in (None, "", 0) or (i == station_idx and new_val == "R")):
-                ws.update_cell(emp['row'], col_num, new_val)
-                write_count += 1
+                if writer.set(emp['row'], col_num, new_val, orig):
+                    write_count += 1
     
-    print(f"✓ Zapsáno {write_count} buněk")
+    # Všechny změny jedním batch_update (po chuncích)
+    requests_sent = writer.flush()
+    print(f"✓ Zapsáno {write_count} buněk ({requests_sent} requestů)")
     
     # STATISTIKY
     print(f"\n{'=' * 60}")
@@ -334,146 +346,52 @@ def plan_shifts_v2(sheet_name: str):
         "sheet": sheet_name,
         "employees": len(employees),
         "days": days_in_month,
-        "written": write_count
+        "written": write_count,
+        "solver": solver_info
     }
 
 
-def run_planner(employees, fixed, fixed_hours, days, year, month, station_idx):
+def run_planner(employees, fixed, fixed_hours, days, year, month, station_idx, seed=None,
+                stats=None):
     """
     Backtracking plánovač s prioritou na vyrovnané hodiny
+    Prohledávání s forward checkingem a MRV pořadím dnů (viz fc_search)
+    Pokus k používá seed + k (default seed je odvozený z roku a měsíce)
+    stats - volitelný slovník, doplní se počet pokusů, uzlů, návratů a max. hloubka
+            prohledávání (benchmark, profilování)
     """
     
-    P = len(employees)
-    D = days
+    if seed is None:
+        seed = year * 1000 + month * 100
     
-    # Připrav struktury
-    assign = [row[:] for row in fixed]
-    hours = fixed_hours[:]
+    D = days
     target = [e['target_hours'] for e in employees]
     
-    # Zjisti víkendy
-    weekends = []
-    for di in range(D):
-        dt = datetime.date(year, month, di + 1)
-        if dt.weekday() == 5:  # sobota
-            weekends.append(di)
-    
-    def can_assign(i, di, shift):
-        """Kontrola hard pravidel"""
-        # Už tam něco je
-        if assign[i][di] is not None:
-            return False
-        
-        # Max 2 směny za sebou
-        consec = 0
-        for dj in range(max(0, di - MAX_CONSEC_SHIFTS), di):
-            if assign[i][dj] in ("D", "N"):
-                consec += 1
-        if consec >= MAX_CONSEC_SHIFTS:
-            return False
-        
-        # Po N musí volno
-        if di > 0 and assign[i][di - 1] == "N":
-            if shift in ("D", "N"):
-                return False
-        
-        return True
-    
-    def score_person(i, shift):
-        """
-        Ohodnocení přiřazení směny osobě
-        Čím MENŠÍ číslo, tím lepší
-        """
-        # Spočítej kolik bude mít po přiřazení
-        future_hours = hours[i] + SHIFT_HOURS
-        
-        # HLAVNÍ KRITÉRIUM: rozdíl od targetu
-        diff = abs(future_hours - target[i])
-        
-        # EXTRA penalizace za přesčas
-        if future_hours > target[i]:
-            diff *= 10.0  # Přesčas je 10x horší
-        
-        # Malý jitter pro randomizaci
-        jitter = random.uniform(-0.01, 0.01)
-        
-        return diff + jitter
-    
-    def solve_day(di):
-        """Rekurzivně naplánuj den"""
-        if di == D:
-            return True
-        
-        # Kolik D a N potřebujeme?
-        needed_d = REQ_D
-        needed_n = REQ_N
-        
-        for i in range(P):
-            if assign[i][di] == "D":
-                needed_d -= 1
-            elif assign[i][di] == "N":
-                needed_n -= 1
-        
-        # Už je hotovo
-        if needed_d <= 0 and needed_n <= 0:
-            return solve_day(di + 1)
-        
-        # Vytvoř seznam slotů
-        slots = ["D"] * max(0, needed_d) + ["N"] * max(0, needed_n)
-        
-        def fill_slots(slot_idx, used):
-            """Vyplň sloty"""
-            if slot_idx == len(slots):
-                return solve_day(di + 1)
-            
-            shift = slots[slot_idx]
-            
-            # Najdi kandidáty
-            candidates = []
-            for i in range(P):
-                if i == station_idx:
-                    continue
-                if i in used:
-                    continue
-                if can_assign(i, di, shift):
-                    score = score_person(i, shift)
-                    candidates.append((score, i))
-            
-            # Seřaď podle skóre (nejlepší první)
-            candidates.sort()
-            
-            # Zkus přiřadit
-            for _, i in candidates:
-                assign[i][di] = shift
-                hours[i] += SHIFT_HOURS
-                used.add(i)
-                
-                if fill_slots(slot_idx + 1, used):
-                    return True
-                
-                # Undo
-                assign[i][di] = None
-                hours[i] -= SHIFT_HOURS
-                used.remove(i)
-            
-            return False
-        
-        return fill_slots(0, set())
+    # Víkendy a svátky (volné víkendy, rozložení svátků - viz CalendarCounters)
+    day_index = day_types(year, month)
     
-    # Najdi řešení
+    # Najdi řešení - předvyplněný rozvrh se převede jednou, pokus dostane jeho kopii
     print("Hledám řešení...")
     MAX_TRIES = 100
+    base = Schedule.from_rows(fixed, D)
     
     for attempt in range(MAX_TRIES):
-        # Reset
-        assign = [row[:] for row in fixed]
-        hours = fixed_hours[:]
-        
-        random.seed(year * 1000 + month * 100 + attempt)
+        rng = random.Random(seed + attempt)
+        search = ForwardCheckingSearch(
+            base.copy(), fixed_hours, target, station_idx, rng,
+            max_consec=MAX_CONSEC_SHIFTS, req_d=REQ_D, req_n=REQ_N,
+            shift_hours=SHIFT_HOURS, day_index=day_index,
+        )
         
-        if solve_day(0):
-            print(f"✓ Řešení nalezeno (pokus {attempt + 1})")
-            return assign, hours
+        result = search.solve()
+        if stats is not None:
+            stats["attempts"] = attempt + 1
+            stats["nodes"] = stats.get("nodes", 0) + search.nodes
+            stats["backtracks"] = stats.get("backtracks", 0) + search.backtracks
+            stats["max_depth"] = max(stats.get("max_depth", 0), search.max_depth)
+        if result:
+            print(f"✓ Řešení nalezeno (pokus {attempt + 1}, uzlů {search.nodes})")
+            return result
         
         if attempt % 10 == 0 and attempt > 0:
             print(f"  Pokus {attempt}...")
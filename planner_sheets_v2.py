@@ -4,14 +4,28 @@ Plánovač V3 - Férové rozdělení
 Hlavní princip: VŠICHNI MAJÍ PODOBNÝ ROZDÍL OD TARGETU
 """
 
-import os
-import json
 import calendar
 import datetime
+import functools
 import random
 import unicodedata
 import gspread
-from google.oauth2.service_account import Credentials
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from sheets_client import read_sheets
+from sheets_backend import default_backend, READ_ERRORS
+from sheets_writer import SheetWriter
+from work_calendar import day_types
+from schedule import Schedule
+from shift_rules import ShiftArrays, ShiftState, CalendarCounters, WEEKEND_PENALTY
+from day_matching import match_day
+from multistart import solve_multistart, DEFAULT_STARTS, MAX_STARTS, DEFAULT_TIME_BUDGET
+from local_search import improve_schedule, penalty
+import plan_cache
+import plan_previews
+import sheet_layout
+import read_cache
+import metrics
 
 # Konfigurace
 SPREADSHEET_ID = "1L3isRHcwU9LyTMYyvT24eZk52fVfCHuYupXQLQmRyyg"
@@ -21,35 +35,21 @@ REQ_D = 3
 REQ_N = 3
 SHIFT_HOURS = 11.0
 MAX_CONSEC_SHIFTS = 2
+TIE_NOISE = 1e-3  # Náhodný šum pro shody priorit (v hodinách)
+HISTORY_DAYS = 7  # Kolik dní předchozího měsíce se přenáší do dalšího
+DN_BALANCE_WEIGHT = 20.0  # Penalizace nevyrovnaného poměru D/N (matching solver)
+# Cena každé dosavadní sváteční směny sestry (matching solver) - víc než rozdíl
+# mezních hodin mezi sestrami (až ~22 * fond), aby svátky šly po jedné na sestru.
+# Polovina navíc, pokud sestra může vzít ještě pozdější sváteční víkend
+HOLIDAY_WEIGHT = 5000.0
+# Parametry requestu, které mění výsledek (a tedy klíč cache)
+CACHE_OPTIONS = ('starts', 'time_budget', 'optimize_seconds', 'optimize_iters')
 
 BLOCK_VALUES = {"R", "DOV", "AMB", "GEN", "K", "COS", "C", "S", "POŽ"}
 HOURS_FIXED = {"R": 8.0, "AMB": 8.0, "S": 8.0, "COS": 7.5, "K": 6.0}
 MAX_NURSE_ROW = 46
 
 
-# České svátky 2026
-HOLIDAYS_2026 = {
-    (1, 1): "Nový rok",
-    (4, 13): "Velikonoční pondělí",  # Pohyblivý - pro 2026
-    (5, 1): "Svátek práce",
-    (5, 8): "Den vítězství",
-    (7, 5): "Den slovanských věrozvěstů Cyrila a Metoděje",
-    (7, 6): "Den upálení mistra Jana Husa",
-    (9, 28): "Den české státnosti",
-    (10, 28): "Den vzniku samostatného československého státu",
-    (11, 17): "Den boje za svobodu a demokracii",
-    (12, 24): "Štědrý den",
-    (12, 25): "1. svátek vánoční",
-    (12, 26): "2. svátek vánoční",
-}
-
-def is_holiday(year, month, day):
-    """Kontrola zda je den svátek"""
-    return (month, day) in HOLIDAYS_2026
-
-
-
-
 def norm_text(s: str) -> str:
     s = (s or "").strip().upper()
     s = unicodedata.normalize("NFKD", s)
@@ -65,24 +65,19 @@ def to_float(v) -> float:
     return float(str(v).replace(",", "."))
 
 
-def connect_to_sheets():
-    scope = [
-        'https://www.googleapis.com/auth/spreadsheets',
-        'https://www.googleapis.com/auth/drive'
-    ]
-    
-    creds_json = os.environ.get('GOOGLE_CREDENTIALS_JSON')
-    if creds_json:
-        creds_dict = json.loads(creds_json)
-        creds = Credentials.from_service_account_info(creds_dict, scopes=scope)
-    else:
-        creds = Credentials.from_service_account_file(CREDENTIALS_FILE, scopes=scope)
-    
-    client = gspread.authorize(creds)
-    return client.open_by_key(SPREADSHEET_ID)
+def connect_to_sheets(backend=None):
+    # backend - volitelně jiný zdroj dat (např. SnapshotBackend, viz sheets_backend)
+    backend = backend or default_backend(SPREADSHEET_ID, CREDENTIALS_FILE)
+    with metrics.stage("connect"):
+        return backend.open_workbook()
 
 
-def get_month_from_sheet_name(sheet_name: str) -> tuple:
+class InvalidBatch(ValueError):
+    """Listy dávky netvoří souvislou řadu měsíců"""
+
+
+def sheet_month(sheet_name):
+    """(rok, měsíc) podle názvu listu nebo None - bez výpisu"""
     # DŮLEŽITÉ: Seřaď od nejdelších (aby CERVENEC byl před CERVEN!)
     mapping = [
         ("CERVENEC", 7), ("LISTOPAD", 11), ("PROSINEC", 12),
@@ -94,10 +89,43 @@ def get_month_from_sheet_name(sheet_name: str) -> tuple:
     name_norm = norm_text(sheet_name)
     for month_name, month_num in mapping:
         if month_name in name_norm:
-            print(f"DEBUG: List {sheet_name} -> měsíc {month_num}")
             return 2026, month_num
-    
-    raise RuntimeError(f"Nerozumím názvu listu: '{sheet_name}'")
+    return None
+
+
+def get_month_from_sheet_name(sheet_name: str) -> tuple:
+    found = sheet_month(sheet_name)
+    if found is None:
+        raise RuntimeError(f"Nerozumím názvu listu: '{sheet_name}'")
+    print(f"DEBUG: List {sheet_name} -> měsíc {found[1]}")
+    return found
+
+
+def batch_order(sheet_names):
+    """
+    Listy dávky seřazené podle měsíce - konec měsíce se přenáší do dalšího,
+    takže musí jít o souvislou řadu (bez mezer a opakování), jinak InvalidBatch
+    """
+    months = {}
+    for sheet_name in sheet_names:
+        found = sheet_month(sheet_name)
+        if found is None:
+            raise InvalidBatch(f"Nerozumím názvu listu: '{sheet_name}'")
+        months[sheet_name] = found[0] * 12 + found[1] - 1
+    ordered = sorted(sheet_names, key=months.get)
+    for prev, sheet_name in zip(ordered, ordered[1:]):
+        if months[sheet_name] != months[prev] + 1:
+            raise InvalidBatch(f"Listy '{prev}' a '{sheet_name}' nejsou po sobě jdoucí měsíce")
+    return ordered
+
+
+def is_day_one(cell):
+    """Buňka s číslem prvního dne měsíce (řádek 1 listu)"""
+    try:
+        return (isinstance(cell, (int, float)) and int(cell) == 1) or \
+               (isinstance(cell, str) and cell.strip() == "1")
+    except:
+        return False
 
 
 def detect_structure(ws_data):
@@ -116,13 +144,9 @@ def detect_structure(ws_data):
     first_row = ws_data[0] if ws_data else []
     start_col = None
     for c_idx, cell in enumerate(first_row):
-        try:
-            if (isinstance(cell, (int, float)) and int(cell) == 1) or \
-               (isinstance(cell, str) and cell.strip() == "1"):
-                start_col = c_idx + 1
-                break
-        except:
-            continue
+        if is_day_one(cell):
+            start_col = c_idx + 1
+            break
     
     if not start_col:
         raise RuntimeError("Nenašel jsem začátek měsíce")
@@ -146,74 +170,146 @@ def load_employees(ws_data, header_row, name_col):
     return employees
 
 
-def load_hours_fund(wb, year, month):
-    try:
-        ws = wb.worksheet("FONDY_HODIN")
-        data = ws.get_all_values()
-        
-        for row in data[1:]:
-            if len(row) < 3:
-                continue
-            
-            if "/" in row[0]:
-                try:
-                    parts = row[0].split("/")
-                    date_month = int(parts[1]) if len(parts[0]) <= 2 else int(parts[0])
-                    if date_month == month:
-                        return to_float(row[1]), to_float(row[2])
-                except:
-                    pass
-        
-        return 176.0, 165.0
-    except:
-        return 176.0, 165.0
+def layout_matches(ws_data, layout):
+    """Levná kontrola uloženého rozložení - 'Jméno' a den 1 jsou pořád na svém místě"""
+    header_row, name_col, start_col = layout
+    return (norm_text(str(cell_value(ws_data, header_row, name_col))) == "JMENO" and
+            is_day_one(cell_value(ws_data, 1, start_col)))
 
 
-def load_employee_types(wb, employees):
-    try:
-        ws = wb.worksheet("ZAMESTNANCI")
-        data = ws.get_all_values()
-        
-        types = {}
-        for row in data[1:]:
-            if len(row) > 3:
-                name = row[0].strip()
-                typ = norm_text(row[3]) if len(row) > 3 else "1S"
-                types[norm_text(name)] = typ
-        
-        return types
-    except:
-        return {}
+def read_month_data(wb, sheet_name, days, extra=()):
+    """
+    Načte plánovací list (days dní) a celé pomocné listy extra jedním čtením
+    Nezměněný sešit (stejná revize, viz read_cache) se nestahuje vůbec
+    Vrací ({název listu: řádky}, layout)
+    """
+    what = (sheet_name, *extra)
+    revision = read_cache.current_revision(wb)
+    cached = read_cache.get(wb, what, revision)
+    if cached:
+        print("✓ Sešit se od posledního čtení nezměnil - data z paměti")
+        return cached
+    
+    data, layout = read_sheet_ranges(wb, sheet_name, days, extra)
+    read_cache.put(wb, what, revision, (data, layout))
+    return data, layout
 
 
-def plan_shifts_v2(sheet_name: str):
+def read_sheet_ranges(wb, sheet_name, days, extra=()):
     """
-    V3 - Férové rozdělení
+    Stáhne listy - se známým rozložením (sheet_layout) jen úvazky, jména a blok
+    plánu (days dní), jinak celý list a rozložení se zjistí a uloží
+    """
+    layout = sheet_layout.get(wb, sheet_name)
+    if layout:
+        ranges = sheet_layout.ranges(sheet_name, layout, days, MAX_NURSE_ROW)
+        extra_ranges = [gspread.utils.absolute_range_name(name) for name in extra]
+        values = wb.read_ranges(ranges + extra_ranges)
+        ws_data = sheet_layout.assemble(values[:len(ranges)], layout, days, MAX_NURSE_ROW)
+        if layout_matches(ws_data, layout):
+            data = {name: gspread.utils.fill_gaps(rows)
+                    for name, rows in zip(extra, values[len(ranges):])}
+            data[sheet_name] = ws_data
+            return data, layout
+        print(f"⚠ Rozložení listu '{sheet_name}' se změnilo - čtu celý list")
+        sheet_layout.forget(wb, sheet_name)
+    
+    data = read_sheets(wb, [sheet_name, *extra])
+    with metrics.stage("detect_structure"):
+        layout = detect_structure(data[sheet_name])
+    sheet_layout.remember(wb, sheet_name, layout)
+    return data, layout
+
+
+def read_plan_data(wb, sheet_name, days):
+    """
+    Načte plánovací list, FONDY_HODIN a ZAMESTNANCI jedním requestem
+    Vrací ({název listu: řádky}, layout)
     """
+    with metrics.stage("read"):
+        try:
+            return read_month_data(wb, sheet_name, days, ("FONDY_HODIN", "ZAMESTNANCI"))
+        except READ_ERRORS as e:
+            # Některý z pomocných listů chybí - plánovací list načti samostatně
+            print(f"⚠ Hromadné čtení selhalo: {e}")
+            return read_month_data(wb, sheet_name, days)
+
+
+def read_month_sheet(wb, sheet_name, days):
+    """Načte jen plánovací list (další měsíc v plan_batch), vrací (řádky, layout)"""
+    with metrics.stage("read"):
+        data, layout = read_month_data(wb, sheet_name, days)
+        return data[sheet_name], layout
+
+
+def load_hours_fund(data, year, month):
+    if data is None:
+        return 176.0, 165.0
     
-    print("=" * 60)
-    print("Plánovač služeb V3 - Férové rozdělení")
-    print("=" * 60)
+    for row in data[1:]:
+        if len(row) < 3:
+            continue
+        
+        if "/" in row[0]:
+            try:
+                parts = row[0].split("/")
+                date_month = int(parts[1]) if len(parts[0]) <= 2 else int(parts[0])
+                if date_month == month:
+                    return to_float(row[1]), to_float(row[2])
+            except:
+                pass
+    
+    return 176.0, 165.0
+
+
+def load_employee_types(data, employees):
+    if data is None:
+        return {}
     
-    print(f"\n[1/7] Připojuji se...")
-    wb = connect_to_sheets()
-    print(f"✓ Připojeno: {wb.title}")
+    types = {}
+    for row in data[1:]:
+        if len(row) > 3:
+            name = row[0].strip()
+            typ = norm_text(row[3]) if len(row) > 3 else "1S"
+            types[norm_text(name)] = typ
     
-    print(f"\n[2/7] Zpracovávám list '{sheet_name}'...")
+    return types
+
+
+def report_stage(progress, step, label):
+    """Vypíše krok [n/7] a nahlásí ho volajícímu (např. asynchronnímu jobu)"""
+    print(f"\n[{step}/7] {label}")
+    if progress:
+        progress("stage", {"step": step, "total": 7, "label": label})
+
+
+def month_info(sheet_name):
+    """Rok, měsíc a počet dní podle názvu listu"""
     year, month = get_month_from_sheet_name(sheet_name)
     days_in_month = calendar.monthrange(year, month)[1]
     print(f"DEBUG: calendar.monthrange({year}, {month}) = {calendar.monthrange(year, month)}")
     print(f"✓ Rok: {year}, Měsíc: {month}, Dní: {days_in_month}")
+    return year, month, days_in_month
+
+
+def prepare_month(sheet_name, month_data, ws_data, fund_data, types_data, progress=None,
+                  layout=None):
+    """
+    Z načtených dat listu připraví vstupy pro solver
+    month_data - (rok, měsíc, dní) z month_info, spočítané jednou na request
+    layout - rozložení z read_month_data (bez něj se zjistí z ws_data)
+    Vrací slovník plánu měsíce (zaměstnanci, předvyplněné směny, sloupce...)
+    """
+    year, month, days_in_month = month_data
     
-    print(f"\n[3/7] Načítám data...")
-    ws = wb.worksheet(sheet_name)
-    ws_data = ws.get_all_values()
-    
-    header_row, name_col, start_col = detect_structure(ws_data)
+    if layout is None:
+        with metrics.stage("detect_structure"):
+            layout = detect_structure(ws_data)
+    header_row, name_col, start_col = layout
     plan_cols = list(range(start_col, start_col + days_in_month))
-    print(f"✓ Struktura OK")
+    print("✓ Struktura OK")
     
-    print(f"\n[4/7] Načítám zaměstnance...")
+    report_stage(progress, 4, "Načítám zaměstnance...")
     employees = load_employees(ws_data, header_row, name_col)
     print(f"✓ Nalezeno {len(employees)} zaměstnanců")
     
@@ -227,19 +323,21 @@ def plan_shifts_v2(sheet_name: str):
     if station_idx is None:
         station_idx = 0
     
-    print(f"\n[5/7] Načítám fondy...")
-    fond_1s, fond_05s = load_hours_fund(wb, year, month)
-    emp_types = load_employee_types(wb, employees)
+    report_stage(progress, 5, "Načítám fondy...")
+    with metrics.stage("load_fund_types"):
+        fond_1s, fond_05s = load_hours_fund(fund_data, year, month)
+        emp_types = load_employee_types(types_data, employees)
     
     for emp in employees:
         name_norm = norm_text(emp['name'])
         typ = emp_types.get(name_norm, "1S")
+        emp['typ'] = typ
         if "1S" in typ:
             emp['target_hours'] = fond_1s * emp['uvazek']
         else:
             emp['target_hours'] = fond_05s * emp['uvazek']
     
-    print(f"\n[6/7] Načítám předvyplněné...")
+    report_stage(progress, 6, "Načítám předvyplněné...")
     fixed = [[None] * days_in_month for _ in employees]
     fixed_hours = [0.0] * len(employees)
     
@@ -272,74 +370,415 @@ def plan_shifts_v2(sheet_name: str):
     r_count = sum(1 for v in fixed[station_idx] if v == "R")
     print(f"✓ Staniční má {fixed_hours[station_idx]}h (R na {r_count} dnů)")
     
-    # NOVÝ ALGORITMUS - FÉROVÉ ROZDĚLENÍ
-    print(f"\n[7/7] Plánuji...")
-    result = fair_planner(employees, fixed, fixed_hours, days_in_month, station_idx)
+    return {
+        "sheet_name": sheet_name,
+        "year": year,
+        "month": month,
+        "days": days_in_month,
+        "funds": (fond_1s, fond_05s),
+        "ws_data": ws_data,
+        "layout": tuple(layout),
+        "plan_cols": plan_cols,
+        "employees": employees,
+        "station_idx": station_idx,
+        "fixed": fixed,
+        "fixed_hours": fixed_hours,
+    }
+
+
+def cell_value(ws_data, row, col):
+    """Původní hodnota buňky (1-based řádek/sloupec), prázdná = """""
+    row_data = ws_data[row - 1] if (row - 1) < len(ws_data) else []
+    return row_data[col - 1] if (col - 1) < len(row_data) else ""
+
+
+def cache_key(plan, options, history, fixed=None):
+    """Hash všeho, na čem závisí výsledek solveru"""
+    solver_name = options.get('solver', 'fair')
+    base_seed = int(options.get('seed', plan['year'] * 1000 + plan['month'] * 100))
+    return plan_cache.make_key({
+        "days": plan['days'],
+        "month": [plan['year'], plan['month']],
+        "station_idx": plan['station_idx'],
+        "fixed": fixed if fixed is not None else plan['fixed'],
+        "fixed_hours": plan['fixed_hours'],
+        "employees": [(e['uvazek'], e['typ']) for e in plan['employees']],
+        "funds": plan['funds'],
+        "history": history,
+        "solver": solver_name,
+        "seed": base_seed,
+        "options": {key: options[key] for key in CACHE_OPTIONS if key in options},
+    })
+
+
+def written_fixed(plan, assign):
+    """Předvyplněné tak, jak je list načte po zápisu assign (viz write_month)"""
+    fixed = [row[:] for row in plan['fixed']]
+    for i, emp in enumerate(plan['employees']):
+        for di, col_num in enumerate(plan['plan_cols']):
+            if fixed[i][di] is None and assign[i][di] in ("D", "N"):
+                if cell_value(plan['ws_data'], emp['row'], col_num) in (None, "", 0):
+                    fixed[i][di] = assign[i][di]
+    return fixed
+
+
+def solve_month(plan, options, history=None, progress=None):
+    """
+    Spustí zvolený solver (multi-start + volitelné lokální vylepšení)
+    history - poslední dny předchozího měsíce pro každou sestru (viz plan_batch)
+    progress - hlásí dokončené seedy (událost "solver", viz solve_multistart)
+    Výsledek se ukládá do plan_cache, opakovaný stejný vstup solver přeskočí
+    Vrací (assign, hours, solver_info)
+    """
+    employees = plan['employees']
+    station_idx = plan['station_idx']
+    target = [e['target_hours'] for e in employees]
+    
+    solver_name = options.get('solver', 'fair')
+    if solver_name not in SOLVERS:
+        raise RuntimeError(f"Neznámý solver '{solver_name}' (možnosti: {', '.join(SOLVERS)})")
+    
+    key = None
+    if options.get('cache', True):
+        key = cache_key(plan, options, history)
+        cached = plan_cache.get(key)
+        if cached:
+            print("✓ Výsledek z cache - solver přeskočen")
+            return cached['assign'], cached['hours'], dict(cached['solver'], cache="hit")
+    
+    # Víc seedů paralelně, vybere se nejférovější rozvrh
+    base_seed = int(options.get('seed', plan['year'] * 1000 + plan['month'] * 100))
+    starts = min(int(options.get('starts', DEFAULT_STARTS)), MAX_STARTS)
+    day_index = day_types(plan['year'], plan['month'])
+    result = solve_multistart(
+        functools.partial(SOLVERS[solver_name], history=history, day_index=day_index),
+        (employees, plan['fixed'], plan['fixed_hours'], plan['days'], station_idx),
+        seeds=[base_seed + k for k in range(starts)],
+        target=target, station_idx=station_idx,
+        req_d=REQ_D, req_n=REQ_N,
+        time_budget=float(options.get('time_budget', DEFAULT_TIME_BUDGET)),
+        parallel=options.get('parallel', True),
+        progress=progress,
+    )
     
     if not result:
         raise RuntimeError("Nelze najít řešení!")
     
-    assign, hours = result
-    
-    # ZÁPIS
+    assign, hours, solver_info = result
+    solver_info['solver'] = solver_name
+    metrics.observe_solver(solver_info)
+    
+    # Volitelné lokální vylepšení (simulované žíhání) v rámci limitu z requestu
+    if options.get('optimize_seconds') or options.get('optimize_iters'):
+        solver_info['optimize'] = improve_schedule(
+            assign, hours, plan['fixed'], target, station_idx,
+            max_consec=MAX_CONSEC_SHIFTS, shift_hours=SHIFT_HOURS,
+            time_limit=float(options.get('optimize_seconds') or 0),
+            max_iters=int(options.get('optimize_iters') or 0),
+            seed=solver_info['seed'], history=history, day_index=day_index,
+        )
+    
+    if key:
+        cached = {"assign": assign, "hours": hours, "solver": solver_info}
+        plan_cache.put(key, cached)
+        # Po zápisu list obsahuje i naplánované směny - opakované plánování
+        # nezměněného listu pak trefí tenhle záznam a nic se nepřepisuje
+        plan_cache.put(cache_key(plan, options, history, written_fixed(plan, assign)), cached)
+        solver_info['cache'] = "miss"
+    
+    return assign, hours, solver_info
+
+
+def current_plan_block(wb, plan):
+    """
+    Oblast plánu těsně před zápisem - data plánu mohla přijít z read_cache a
+    revize sešitu (modifiedTime) se může za ruční úpravou opozdit. Ručně
+    vyplněná buňka se tak nikdy nepřepíše. Posunuté řádky / sloupce = chyba
+    """
+    sheet_name = plan['sheet_name']
+    data, layout = read_sheet_ranges(wb, sheet_name, plan['days'])
+    ws_data = data[sheet_name]
+    name_col = layout[1]
+    if tuple(layout) != plan['layout'] or any(
+            str(cell_value(ws_data, emp['row'], name_col)).strip() != emp['name']
+            for emp in plan['employees']):
+        raise RuntimeError(f"List '{sheet_name}' se během plánování změnil (řádky / sloupce) - "
+                           f"naplánuj ho znovu")
+    return ws_data
+
+
+def month_writes(plan, assign, ws_data):
+    """Buňky k zápisu podle obsahu listu: [(řádek, sloupec, hodnota, původní)]"""
+    station_idx = plan['station_idx']
+    writes = []
+    for di, col_num in enumerate(plan['plan_cols']):
+        for i, emp in enumerate(plan['employees']):
+            orig = cell_value(ws_data, emp['row'], col_num)
+            
+            new_val = assign[i][di]
+            if new_val and (orig in (None, "", 0) or (i == station_idx and new_val == "R")):
+                writes.append((emp['row'], col_num, new_val, orig))
+    return writes
+
+
+def write_month(wb, plan, assign, progress=None):
+    """Zapíše do listu jen změněné buňky, vrací počet zapsaných"""
     print(f"\n{'=' * 60}")
     print("Zapisuji...")
     print('=' * 60)
     
+    writer = SheetWriter(wb, plan['sheet_name'])
     write_count = 0
-    min_row = min(e['row'] for e in employees)
-    max_row = max(e['row'] for e in employees)
-    min_col = min(plan_cols)
-    max_col = max(plan_cols)
-    
-    num_rows = max_row - min_row + 1
-    num_cols = max_col - min_col + 1
-    grid = [[None] * num_cols for _ in range(num_rows)]
-    
-    for di, col_num in enumerate(plan_cols):
-        for i, emp in enumerate(employees):
-            row_data = ws_data[emp['row'] - 1] if (emp['row'] - 1) < len(ws_data) else []
-            col_idx = col_num - 1
-            
-            orig = ""
-            if col_idx < len(row_data):
-                orig = row_data[col_idx]
-            
-            new_val = assign[i][di]
-            if new_val and (orig in (None, "", 0) or (i == station_idx and new_val == "R")):
-                grid_row = emp['row'] - min_row
-                grid_col = col_num - min_col
-                grid[grid_row][grid_col] = new_val
-                write_count += 1
     
-    if write_count > 0:
-        import gspread
-        start_cell = gspread.utils.rowcol_to_a1(min_row, min_col)
-        end_cell = gspread.utils.rowcol_to_a1(max_row, max_col)
-        range_notation = f"{start_cell}:{end_cell}"
-        ws.update(range_notation, grid, value_input_option='RAW')
-    
-    print(f"✓ Zapsáno {write_count} buněk")
-    
-    # STATISTIKY
+    writes = month_writes(plan, assign, plan['ws_data'])
+    if any(value != orig for row, col, value, orig in writes):
+        # Před zápisem znovu jen blok plánu - co mezitím někdo vyplnil, zůstane
+        with metrics.stage("read"):
+            fresh = month_writes(plan, assign, current_plan_block(wb, plan))
+        skipped = len(set(w[:2] for w in writes) - set(w[:2] for w in fresh))
+        if skipped:
+            print(f"⚠ {skipped} buněk mezitím někdo vyplnil - nepřepisuji")
+        writes = fresh
+    
+    for row, col, value, orig in writes:
+        if writer.set(row, col, value, orig):
+            write_count += 1
+    
+    requests_sent = writer.flush()
+    print(f"✓ Zapsáno {write_count} buněk ({requests_sent} requestů)")
+    if progress:
+        progress("written", {"sheet": plan['sheet_name'], "written": write_count,
+                             "requests": requests_sent})
+    return write_count
+
+
+def employee_stats(plan, assign, hours):
+    """Hodiny a počty směn každé sestry (výpis i náhled plánu)"""
+    stats = []
+    for i, emp in enumerate(plan['employees']):
+        d_count = sum(1 for v in assign[i] if v == "D")
+        n_count = sum(1 for v in assign[i] if v == "N")
+        stats.append({
+            "name": emp['name'],
+            "target": round(emp['target_hours'], 1),
+            "planned": round(hours[i], 1),
+            "diff": round(hours[i] - emp['target_hours'], 1),
+            "shifts": d_count + n_count,
+            "D": d_count,
+            "N": n_count,
+        })
+    return stats
+
+
+def print_stats(plan, assign, hours):
     print(f"\n{'=' * 60}")
     print("STATISTIKY")
     print('=' * 60)
     
-    for i, emp in enumerate(employees):
-        diff = hours[i] - emp['target_hours']
-        d_count = sum(1 for v in assign[i] if v == "D")
-        n_count = sum(1 for v in assign[i] if v == "N")
-        total_shifts = d_count + n_count
-        
-        print(f"{emp['name']:15s} target={emp['target_hours']:6.1f} "
-              f"planned={hours[i]:6.1f} diff={diff:+6.1f} "
-              f"shifts={total_shifts:2d} (D={d_count} N={n_count})")
+    for s in employee_stats(plan, assign, hours):
+        print(f"{s['name']:15s} target={s['target']:6.1f} "
+              f"planned={s['planned']:6.1f} diff={s['diff']:+6.1f} "
+              f"shifts={s['shifts']:2d} (D={s['D']} N={s['N']})")
+
+
+def employee_rows(plan):
+    """Sestry a jejich řádky - podle nich se pozná, že se list od náhledu nezměnil"""
+    return [[emp['name'], emp['row']] for emp in plan['employees']]
+
+
+def save_preview(plan, assign, hours, solver_info):
+    """
+    Uloží naplánovaný rozvrh bez zápisu (dry_run), vrací náhled pro odpověď
+    assign - řádky po sestrách, prázdný řetězec = volno
+    """
+    preview_id = plan_previews.save({
+        "sheet": plan['sheet_name'],
+        "employees": employee_rows(plan),
+        "fixed": plan['fixed'],
+        "assign": assign,
+        "solver": solver_info,
+    })
+    print(f"✓ Náhled {preview_id} - do listu se nic nezapsalo")
+    return {
+        "id": preview_id,
+        "days": plan['days'],
+        "employees": employee_stats(plan, assign, hours),
+        "assign": [[v or "" for v in row] for row in assign],
+    }
+
+
+def plan_shifts_v2(sheet_name: str, options=None, progress=None, backend=None):
+    """
+    V3 - Férové rozdělení
+    options - volitelné parametry z requestu (solver, seed, starts, time_budget,
+              optimize_seconds, optimize_iters, dry_run)
+              s dry_run se nic nezapisuje, vrací se náhled (viz commit_preview)
+    progress(event, data) - volitelný callback pro hlášení průběhu
+    backend - zdroj dat (default Google Sheets nebo env SHEETS_SNAPSHOT)
+    """
+    options = options or {}
+    
+    print("=" * 60)
+    print("Plánovač služeb V3 - Férové rozdělení")
+    print("=" * 60)
+    
+    report_stage(progress, 1, "Připojuji se...")
+    wb = connect_to_sheets(backend)
+    print(f"✓ Připojeno: {wb.title}")
+    
+    report_stage(progress, 2, f"Zpracovávám list '{sheet_name}'...")
+    month_data = month_info(sheet_name)
+    
+    report_stage(progress, 3, "Načítám data...")
+    sheets_data, layout = read_plan_data(wb, sheet_name, month_data[2])
+    plan = prepare_month(sheet_name, month_data, sheets_data[sheet_name],
+                         sheets_data.get("FONDY_HODIN"), sheets_data.get("ZAMESTNANCI"),
+                         progress, layout)
+    
+    # NOVÝ ALGORITMUS - FÉROVÉ ROZDĚLENÍ
+    report_stage(progress, 7, "Plánuji...")
+    with metrics.stage("solve"):
+        assign, hours, solver_info = solve_month(plan, options, progress=progress)
+    
+    if options.get('dry_run'):
+        # Náhled - zapíše se až přes commit_preview
+        print_stats(plan, assign, hours)
+        return {"status": "success", "sheet": sheet_name, "written": 0, "dry_run": True,
+                "preview": save_preview(plan, assign, hours, solver_info),
+                "solver": solver_info, "throttled_seconds": round(wb.throttled_seconds, 2)}
+    
+    with metrics.stage("write"):
+        write_count = write_month(wb, plan, assign, progress)
+    print_stats(plan, assign, hours)
+    
+    return {"status": "success", "sheet": sheet_name, "written": write_count,
+            "solver": solver_info, "throttled_seconds": round(wb.throttled_seconds, 2)}
+
+
+def commit_preview(preview_id, progress=None, backend=None):
+    """
+    Zapíše dříve uložený náhled (plan_shifts_v2 s dry_run) přesně tak, jak byl
+    List se načte znovu - pokud se od náhledu změnily předvyplněné buňky nebo
+    řádky sester, zápis se odmítne (PreviewOutdated)
+    """
+    preview = plan_previews.load(preview_id)
+    sheet_name = preview['sheet']
+    
+    print("=" * 60)
+    print(f"Zápis náhledu {preview_id} do listu '{sheet_name}'")
+    print("=" * 60)
+    
+    report_stage(progress, 1, "Připojuji se...")
+    wb = connect_to_sheets(backend)
+    
+    report_stage(progress, 3, "Načítám data...")
+    month_data = month_info(sheet_name)
+    sheets_data, layout = read_plan_data(wb, sheet_name, month_data[2])
+    plan = prepare_month(sheet_name, month_data, sheets_data[sheet_name],
+                         sheets_data.get("FONDY_HODIN"), sheets_data.get("ZAMESTNANCI"),
+                         progress, layout)
+    if employee_rows(plan) != preview['employees'] or plan['fixed'] != preview['fixed']:
+        raise plan_previews.PreviewOutdated(
+            f"List '{sheet_name}' se od náhledu změnil - naplánuj ho znovu")
+    
+    with metrics.stage("write"):
+        write_count = write_month(wb, plan, preview['assign'], progress)
+    plan_previews.discard(preview_id)
+    
+    return {"status": "success", "sheet": sheet_name, "preview_id": preview_id,
+            "written": write_count, "throttled_seconds": round(wb.throttled_seconds, 2)}
+
+
+def trailing_history(plan, assign):
+    """Posledních HISTORY_DAYS dní každé sestry (podle jména) pro další měsíc"""
+    return {
+        norm_text(emp['name']): assign[i][-HISTORY_DAYS:]
+        for i, emp in enumerate(plan['employees'])
+    }
+
+
+def history_for(plan, carry):
+    """Historie z předchozího měsíce v pořadí zaměstnanců plánu"""
+    if not carry:
+        return None
+    history = []
+    for emp in plan['employees']:
+        tail = carry.get(norm_text(emp['name']), [])
+        history.append([None] * (HISTORY_DAYS - len(tail)) + list(tail))
+    return history
+
+
+def plan_batch(sheet_names, options=None, progress=None, backend=None):
+    """
+    Naplánuje víc měsíců po sobě (např. čtvrtletí nebo rok)
+    Jedno připojení a jedno načtení FONDY_HODIN / ZAMESTNANCI, konec
+    měsíce se přenáší do dalšího (N 31. a D 1. se tak pohlídá).
+    Další list se načítá na pozadí, zatímco běží solver aktuálního.
+    Listy se seřadí podle měsíce (batch_order), mezera v řadě je InvalidBatch.
+    """
+    options = options or {}
+    if not sheet_names:
+        raise RuntimeError("Žádné listy k plánování!")
+    sheet_names = batch_order(sheet_names)
+    
+    print("=" * 60)
+    print(f"Plánovač služeb V3 - dávka {len(sheet_names)} listů")
+    print("=" * 60)
+    
+    report_stage(progress, 1, "Připojuji se...")
+    wb = connect_to_sheets(backend)
+    print(f"✓ Připojeno: {wb.title}")
     
-    return {"status": "success", "sheet": sheet_name, "written": write_count}
+    month_data = [month_info(sheet_name) for sheet_name in sheet_names]
+    
+    report_stage(progress, 3, "Načítám data...")
+    sheets_data, layout = read_plan_data(wb, sheet_names[0], month_data[0][2])
+    fund_data = sheets_data.get("FONDY_HODIN")
+    types_data = sheets_data.get("ZAMESTNANCI")
+    ws_data = sheets_data[sheet_names[0]]
+    
+    months = []
+    carry = {}
+    with ThreadPoolExecutor(max_workers=1) as prefetch:
+        for k, sheet_name in enumerate(sheet_names):
+            if progress:
+                progress("month", {"sheet": sheet_name, "index": k + 1, "total": len(sheet_names)})
+            
+            next_read = None
+            if k + 1 < len(sheet_names):
+                next_read = prefetch.submit(read_month_sheet, wb, sheet_names[k + 1],
+                                            month_data[k + 1][2])
+            
+            report_stage(progress, 2, f"Zpracovávám list '{sheet_name}'...")
+            plan = prepare_month(sheet_name, month_data[k], ws_data, fund_data, types_data,
+                                 progress, layout)
+            
+            report_stage(progress, 7, "Plánuji...")
+            with metrics.stage("solve"):
+                assign, hours, solver_info = solve_month(plan, options, history_for(plan, carry),
+                                                         progress)
+            
+            with metrics.stage("write"):
+                write_count = write_month(wb, plan, assign, progress)
+            print_stats(plan, assign, hours)
+            
+            carry = trailing_history(plan, assign)
+            months.append({"sheet": sheet_name, "written": write_count, "solver": solver_info})
+            
+            if next_read:
+                ws_data, layout = next_read.result()
+    
+    return {
+        "status": "success",
+        "sheets": sheet_names,
+        "written": sum(m['written'] for m in months),
+        "months": months,
+        "throttled_seconds": round(wb.throttled_seconds, 2),
+    }
 
 
-def fair_planner(employees, fixed, fixed_hours, days, station_idx):
+def fair_planner(employees, fixed, fixed_hours, days, station_idx, seed=None, history=None,
+                 day_index=None):
     """
     NOVÝ ALGORITMUS - FÉROVÉ ROZDĚLENÍ
     
@@ -348,94 +787,133 @@ def fair_planner(employees, fixed, fixed_hours, days, station_idx):
     2. Vyber den
     3. Pro ten den: vyber lidi kteří nejvíc potřebují směnu
     4. Přiřaď jim (vždy tak aby zůstali FÉROVĚ)
+    
+    Kandidáti na den se hodnotí najednou v NumPy polích a vybírá se
+    top-k přes argpartition. seed určuje pořadí dnů i rozhodování shod.
+    history - konec předchozího měsíce (viz plan_batch)
+    day_index - víkendy a svátky měsíce (work_calendar.day_types): sestra si
+                drží volné víkendy, směny o svátcích dostávají ti, kdo jich mají méně
     """
     
     P = len(employees)
     D = days
+    rng = np.random.default_rng(seed)
     
-    assign = [row[:] for row in fixed]
-    hours = fixed_hours[:]
-    target = [e['target_hours'] for e in employees]
+    schedule = Schedule.from_rows(fixed, D)
+    hours = np.array(fixed_hours, dtype=float)
+    target = np.array([e['target_hours'] for e in employees], dtype=float)
     
     # Spočítej kolik směn každý potřebuje (přibližně)
-    needed_shifts = []
-    for i in range(P):
-        remaining = target[i] - hours[i]
-        shifts_needed = int(round(remaining / 11.0))
-        needed_shifts.append(max(0, shifts_needed))
-    
-    print(f"Potřeby směn: {needed_shifts}")
+    needed_shifts = np.maximum(0, np.round((target - hours) / SHIFT_HOURS)).astype(int)
+    print(f"Potřeby směn: {needed_shifts.tolist()}")
     
-    def can_assign(i, di, shift):
-        if assign[i][di] is not None:
-            return False
-        
-        consec = 0
-        for dj in range(max(0, di - MAX_CONSEC_SHIFTS), di):
-            if assign[i][dj] in ("D", "N"):
-                consec += 1
-        if consec >= MAX_CONSEC_SHIFTS:
-            return False
-        
-        if di > 0 and assign[i][di - 1] == "N":
-            if shift in ("D", "N"):
-                return False
-        
-        return True
+    # Hard pravidla pro všechny osoby najednou (viz shift_rules)
+    state = ShiftArrays(schedule, MAX_CONSEC_SHIFTS, D, history)
+    cal = CalendarCounters(schedule, day_index) if day_index else None
     
-    def get_priority(i):
-        """Priorita osoby - čím víc potřebuje směnu, tím vyšší"""
-        remaining = target[i] - hours[i]
-        return remaining
+    not_station = np.ones(P, dtype=bool)
+    not_station[station_idx] = False
     
     # HLAVNÍ SMYČKA - den po dni (NÁHODNÉ POŘADÍ!)
-    day_order = list(range(D))
-    random.shuffle(day_order)  # Zamíchej pořadí dnů
-    
-    for di in day_order:
-        # Kolik potřebujeme?
-        needed_d = REQ_D
-        needed_n = REQ_N
-        
-        for i in range(P):
-            if assign[i][di] == "D":
-                needed_d -= 1
-            elif assign[i][di] == "N":
-                needed_n -= 1
+    # Každý den se plní jednou, počítadla rozvrhu tedy drží jen předvyplněné D/N
+    for di in rng.permutation(D).tolist():
+        needed = (("D", REQ_D - int(schedule.d_count[di])), ("N", REQ_N - int(schedule.n_count[di])))
         
-        # Přiřaď D
-        for _ in range(needed_d):
-            candidates = []
-            for i in range(P):
-                if i == station_idx:
-                    continue
-                if can_assign(i, di, "D"):
-                    priority = get_priority(i)
-                    candidates.append((priority, random.random(), i))
+        for shift, count in needed:
+            if count <= 0:
+                continue
             
-            if candidates:
-                candidates.sort(reverse=True)
-                _, _, best_i = candidates[0]
-                assign[best_i][di] = "D"
-                hours[best_i] += 11.0
-        
-        # Přiřaď N
-        for _ in range(needed_n):
-            candidates = []
-            for i in range(P):
-                if i == station_idx:
-                    continue
-                if can_assign(i, di, "N"):
-                    priority = get_priority(i)
-                    candidates.append((priority, random.random(), i))
+            candidates = np.flatnonzero(state.eligible(di, shift) & not_station)
+            if len(candidates) == 0:
+                continue
+            
+            # Priorita = kolik hodin chybí do targetu, šum rozhoduje jen shody
+            k = min(count, len(candidates))
+            priority = target[candidates] - hours[candidates]
+            priority += rng.random(len(candidates)) * TIE_NOISE
+            if cal:
+                priority -= SHIFT_HOURS * cal.penalty(candidates, di)
+            best = candidates[np.argpartition(-priority, k - 1)[:k]]
             
-            if candidates:
-                candidates.sort(reverse=True)
-                _, _, best_i = candidates[0]
-                assign[best_i][di] = "N"
-                hours[best_i] += 11.0
+            state.assign(best, di, shift)
+            schedule.place(best, di, shift)
+            if cal:
+                cal.assign(best, di)
+            hours[best] += SHIFT_HOURS
+    
+    return schedule.to_rows(), hours.tolist()
+
+
+def matching_planner(employees, fixed, fixed_hours, days, station_idx, seed=None, history=None,
+                     day_index=None):
+    """
+    Den po dni: všechny D a N sloty dne se obsadí najednou jako
+    min-cost matching (viz day_matching) místo výběru slot po slotu
+    
+    Cena = o kolik se zhorší/zlepší odchylka od targetu (stejná penalizace
+    jako v local_search, přesčas je dražší) + penalizace za nevyrovnaný
+    poměr D/N u sestry + víkendy a svátky (viz CalendarCounters)
+    history - konec předchozího měsíce (viz plan_batch)
+    day_index - víkendy a svátky měsíce (work_calendar.day_types)
+    """
+    
+    P = len(employees)
+    D = days
+    rng = random.Random(seed)
     
-    return assign, hours
+    schedule = Schedule.from_rows(fixed, D)
+    hours = fixed_hours[:]
+    target = [e['target_hours'] for e in employees]
+    state = ShiftState(schedule, MAX_CONSEC_SHIFTS, history)
+    cal = CalendarCounters(schedule, day_index) if day_index else None
+    everyone = np.arange(P)
+    counts = {"D": [0] * P, "N": [0] * P}
+    people = [i for i in range(P) if i != station_idx]
+    
+    def cost(i, shift):
+        if not state.fits(i, di, shift):
+            return None
+        diff = hours[i] - target[i]
+        marginal = penalty(diff + SHIFT_HOURS) - penalty(diff)
+        other = "N" if shift == "D" else "D"
+        balance = DN_BALANCE_WEIGHT * (counts[shift][i] - counts[other][i])
+        if day_penalty:
+            balance += day_penalty[i]
+        return marginal + balance + rng.uniform(-0.01, 0.01)
+    
+    # Předvyplněné D/N se započítají z počítadel rozvrhu, ne procházením všech osob
+    needed_d, needed_n = schedule.needed(REQ_D, REQ_N)
+    for di in range(D):
+        slots = ["D"] * int(needed_d[di]) + ["N"] * int(needed_n[di])
+        if not slots:
+            continue
+        
+        candidates = [i for i in people if state.fits(i, di, "D")]
+        # Víkend / svátek stojí pro osobu stejně ve všech slotech dne
+        day_penalty = None
+        if cal and cal.special(di):
+            day_penalty = DN_BALANCE_WEIGHT * WEEKEND_PENALTY * cal.breaks_weekend(everyone, di)
+            if cal.holiday[di]:
+                day_penalty = day_penalty + HOLIDAY_WEIGHT * (
+                    cal.holiday_shifts + 0.5 * cal.holiday_later(everyone, di))
+            day_penalty = np.broadcast_to(day_penalty, P).tolist()
+        for slot_idx, i in match_day(slots, candidates, cost):
+            shift = slots[slot_idx]
+            schedule.place(i, di, shift)
+            state.assign(i, di, shift)
+            if cal:
+                cal.assign(i, di)
+            hours[i] += SHIFT_HOURS
+            counts[shift][i] += 1
+    
+    return schedule.to_rows(), hours
+
+
+# Dostupné solvery (volba "solver" v requestu)
+SOLVERS = {
+    "fair": fair_planner,
+    "matching": matching_planner,
+}
 
 
 if __name__ == "__main__":
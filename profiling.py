@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+"""
+Profilování jednoho plánování (POST /plan s "profile")
+Request běží pod cProfile, vrací se tabulka nejdražších funkcí a počítadla
+solveru, celý profil se uloží jako .pstats ke stažení (snakeviz, flameprof...)
+
+Zapíná se env PLAN_PROFILING=1 - profilování zpomaluje a běží jen v jednom vlákně
+"""
+
+import os
+import re
+import time
+import uuid
+import pstats
+import cProfile
+import tempfile
+
+PROFILING_ENABLED = os.environ.get('PLAN_PROFILING') == '1'
+PROFILE_DIR = os.environ.get('PLAN_PROFILE_DIR',
+                             os.path.join(tempfile.gettempdir(), 'planovac_profiles'))
+# Kolik nejdražších funkcí vrátit
+DEFAULT_TOP = 30
+# Kontroly hard pravidel, jejichž počet volání se vrací zvlášť
+RULE_FUNCTIONS = ("can_assign", "fits", "eligible")
+
+
+def _label(func):
+    filename, line, name = func
+    if filename == "~":
+        return name
+    return f"{os.path.basename(filename)}:{line}({name})"
+
+
+def hot_functions(stats, top):
+    """Nejdražší funkce podle vlastního času"""
+    rows = []
+    for func, (cc, nc, tt, ct, callers) in stats.stats.items():
+        rows.append({
+            "function": _label(func),
+            "calls": nc,
+            "self_s": round(tt, 4),
+            "cumulative_s": round(ct, 4),
+        })
+    rows.sort(key=lambda r: r["self_s"], reverse=True)
+    return rows[:top]
+
+
+def rule_checks(stats):
+    """Počet volání kontrol pravidel (ShiftState / ShiftArrays)"""
+    counts = {}
+    for (filename, line, name), (cc, nc, tt, ct, callers) in stats.stats.items():
+        if name in RULE_FUNCTIONS and os.path.basename(filename) == "shift_rules.py":
+            counts[name] = counts.get(name, 0) + nc
+    return counts
+
+
+def run_profiled(fn, *args, top=DEFAULT_TOP, **kwargs):
+    """
+    Spustí fn(*args, **kwargs) pod cProfile
+    Vrací (výsledek, report) - report obsahuje id uloženého profilu
+    """
+    profiler = cProfile.Profile()
+    started = time.perf_counter()
+    profiler.enable()
+    try:
+        result = fn(*args, **kwargs)
+    finally:
+        profiler.disable()
+    seconds = time.perf_counter() - started
+
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    profile_id = uuid.uuid4().hex
+    profiler.dump_stats(os.path.join(PROFILE_DIR, f"{profile_id}.pstats"))
+
+    stats = pstats.Stats(profiler)
+    report = {
+        "id": profile_id,
+        "seconds": round(seconds, 3),
+        "top": hot_functions(stats, top),
+        "rule_checks": rule_checks(stats),
+    }
+    return result, report
+
+
+def profile_path(profile_id):
+    """Cesta k uloženému profilu nebo None (id je jen hex, žádné cesty z requestu)"""
+    if not re.fullmatch(r"[0-9a-f]{32}", profile_id or ""):
+        return None
+    path = os.path.join(PROFILE_DIR, f"{profile_id}.pstats")
+    return path if os.path.exists(path) else None
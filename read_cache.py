@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+"""
+Načtená data listů podle revize sešitu
+Před stažením listů se zjistí revize sešitu (u Google modifiedTime z Drive API,
+viz sheets_backend) - pokud se od posledního čtení nezměnila, použijí se už
+načtená a zpracovaná data a Sheets API se vůbec nevolá
+
+Cache je na proces (gunicorn worker), drží posledních CACHE_SIZE čtení.
+Vypíná se env SHEETS_REVISION_CACHE=0
+"""
+
+import os
+import threading
+from collections import OrderedDict
+
+import gspread
+import requests
+
+import metrics
+
+ENABLED = os.environ.get('SHEETS_REVISION_CACHE', '1') != '0'
+CACHE_SIZE = 32
+# Revizi se nepodařilo zjistit - čte se normálně
+REVISION_ERRORS = (gspread.exceptions.APIError, requests.exceptions.RequestException, OSError)
+
+_lock = threading.Lock()
+_entries = OrderedDict()
+
+
+def current_revision(wb):
+    """Revize sešitu nebo None (neznámá - data se vždy stáhnou)"""
+    if not ENABLED:
+        return None
+    try:
+        return wb.revision()
+    except REVISION_ERRORS as e:
+        print(f"⚠️  Revizi sešitu nelze zjistit: {e}")
+        return None
+
+
+def get(wb, what, revision):
+    """Data načtená při stejné revizi, jinak None"""
+    if revision is None:
+        metrics.REVISION_CHECKS.labels('unknown').inc()
+        return None
+    key = (wb.key, what)
+    with _lock:
+        entry = _entries.get(key)
+        if entry is None or entry[0] != revision:
+            metrics.REVISION_CHECKS.labels('changed').inc()
+            return None
+        _entries.move_to_end(key)
+    metrics.REVISION_CHECKS.labels('unchanged').inc()
+    return entry[1]
+
+
+def put(wb, what, revision, value):
+    """
+    Uloží data načtená při revizi zjištěné PŘED čtením - úprava během
+    stahování tak dá novou revizi a příště se čte znovu
+    value se sdílí mezi requesty, nesmí se měnit
+    """
+    if revision is None:
+        return
+    with _lock:
+        _entries[(wb.key, what)] = (revision, value)
+        _entries.move_to_end((wb.key, what))
+        while len(_entries) > CACHE_SIZE:
+            _entries.popitem(last=False)
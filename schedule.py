@@ -0,0 +1,138 @@
+# -*- coding: utf-8 -*-
+"""
+Kompaktní rozvrh pro solvery - matice P×D int8 místo seznamů řetězců
+Buňka je kód z Cell (volno, D, N nebo blokovaná hodnota), pro každý den
+se drží počet obsazených D a N. Kopie / snapshot je jedno memcpy.
+
+Na hranici (vstup z listu, výstup solveru) se převádí z/na řádky hodnot
+přes from_rows() / to_rows().
+"""
+
+import enum
+
+import numpy as np
+
+
+class Cell(enum.IntEnum):
+    FREE = 0
+    D = 1
+    N = 2
+    # Blokované hodnoty (BLOCK_VALUES v plánovačích)
+    R = 3
+    DOV = 4
+    AMB = 5
+    GEN = 6
+    K = 7
+    COS = 8
+    C = 9
+    S = 10
+    POZ = 11
+
+
+# Kód -> hodnota v listu a zpět
+CELL_VALUES = (None, "D", "N", "R", "DOV", "AMB", "GEN", "K", "COS", "C", "S", "POŽ")
+CELL_CODES = {value: code for code, value in enumerate(CELL_VALUES)}
+
+# Pro horké smyčky - obyčejné inty místo atributů enumu
+FREE, DAY, NIGHT = int(Cell.FREE), int(Cell.D), int(Cell.N)
+SHIFT_CODES = {"D": DAY, "N": NIGHT}
+
+
+def _row_bits(mask):
+    """Bool matice P×D -> bitová maska (int) pro každý řádek, bit di = den di"""
+    packed = np.packbits(mask, axis=1, bitorder="little")
+    return [int.from_bytes(row.tobytes(), "little") for row in packed]
+
+
+class Schedule:
+    """Rozvrh P×D s počítadly D/N po dnech"""
+
+    __slots__ = ("cells", "d_count", "n_count")
+
+    def __init__(self, cells, d_count=None, n_count=None):
+        self.cells = cells
+        if d_count is None:
+            d_count = (cells == DAY).sum(axis=0, dtype=np.int16)
+            n_count = (cells == NIGHT).sum(axis=0, dtype=np.int16)
+        self.d_count = d_count
+        self.n_count = n_count
+
+    @classmethod
+    def from_rows(cls, rows, days=None):
+        """Z řádků hodnot (None = volno); neznámá hodnota je ValueError"""
+        if days is None:
+            days = len(rows[0]) if rows else 0
+        cells = np.zeros((len(rows), days), dtype=np.int8)
+        for i, row in enumerate(rows):
+            for di, value in enumerate(row):
+                if value is not None:
+                    try:
+                        cells[i, di] = CELL_CODES[value]
+                    except KeyError:
+                        raise ValueError(f"Neznámá hodnota v rozvrhu: {value!r}") from None
+        return cls(cells)
+
+    def to_rows(self):
+        """Zpět na řádky hodnot (výstup solveru)"""
+        return [[CELL_VALUES[code] for code in row] for row in self.cells.tolist()]
+
+    @property
+    def people(self):
+        return self.cells.shape[0]
+
+    @property
+    def days(self):
+        return self.cells.shape[1]
+
+    def copy(self):
+        return Schedule(self.cells.copy(), self.d_count.copy(), self.n_count.copy())
+
+    def snapshot(self):
+        return self.cells.copy(), self.d_count.copy(), self.n_count.copy()
+
+    def restore(self, snap):
+        cells, d_count, n_count = snap
+        np.copyto(self.cells, cells)
+        np.copyto(self.d_count, d_count)
+        np.copyto(self.n_count, n_count)
+
+    def value(self, i, di):
+        return CELL_VALUES[self.cells[i, di]]
+
+    def is_free(self, i, di):
+        return self.cells[i, di] == FREE
+
+    def place(self, idx, di, shift):
+        """Zapíše směnu D/N jedné osobě nebo poli osob (buňky musí být volné)"""
+        code = SHIFT_CODES[shift]
+        self.cells[idx, di] = code
+        count = np.size(idx)
+        if code == DAY:
+            self.d_count[di] += count
+        else:
+            self.n_count[di] += count
+
+    def remove(self, i, di):
+        """Uvolní směnu D/N (undo při backtrackingu)"""
+        code = self.cells[i, di]
+        if code == DAY:
+            self.d_count[di] -= 1
+        elif code == NIGHT:
+            self.n_count[di] -= 1
+        self.cells[i, di] = FREE
+
+    def needed(self, req_d, req_n):
+        """Kolik D a N v každém dni ještě chybí (pole délky D, nezáporná)"""
+        return (np.maximum(0, req_d - self.d_count).astype(int),
+                np.maximum(0, req_n - self.n_count).astype(int))
+
+    def masks(self):
+        """Bool matice (taken, work, night) - obsazeno, pracovní směna, noční"""
+        taken = self.cells != FREE
+        night = self.cells == NIGHT
+        work = night | (self.cells == DAY)
+        return taken, work, night
+
+    def bitmasks(self):
+        """Totéž jako masks(), ale pro každou osobu int s bitem za den (ShiftState)"""
+        return tuple(_row_bits(mask) for mask in self.masks())
@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+"""
+Rozložení plánovacího listu - řádek hlavičky, sloupec jmen a sloupec prvního dne
+Po prvním celém čtení si ho pamatujeme pro každý list a další čtení stahují jen
+oblasti, které plánovač potřebuje: úvazky (sloupec A), jména a blok plánu
+Poznámky a souhrny vpravo a dole se tak nestahují ani neparsují
+
+Rozložení je (header_row, name_col, start_col), vše 1-based jako v detect_structure
+"""
+
+import threading
+
+import gspread
+
+_lock = threading.Lock()
+_layouts = {}
+
+
+def _key(wb, sheet_name):
+    return wb.key, sheet_name
+
+
+def get(wb, sheet_name):
+    """Uložené rozložení listu nebo None"""
+    with _lock:
+        return _layouts.get(_key(wb, sheet_name))
+
+
+def remember(wb, sheet_name, layout):
+    with _lock:
+        _layouts[_key(wb, sheet_name)] = tuple(layout)
+
+
+def forget(wb, sheet_name):
+    with _lock:
+        _layouts.pop(_key(wb, sheet_name), None)
+
+
+def _blocks(layout, days):
+    """Sloupcové bloky (od, do) k načtení - úvazky, jména, plán"""
+    header_row, name_col, start_col = layout
+    blocks = [(1, 1)]
+    if name_col != 1:
+        blocks.append((name_col, name_col))
+    blocks.append((start_col, start_col + days - 1))
+    return blocks
+
+
+def ranges(sheet_name, layout, days, max_row):
+    """A1 oblasti pro values:batchGet - řádky 1..max_row (řádek 1 nese čísla dnů)"""
+    return [
+        gspread.utils.absolute_range_name(
+            sheet_name,
+            f"{gspread.utils.rowcol_to_a1(1, c0)}:{gspread.utils.rowcol_to_a1(max_row, c1)}")
+        for c0, c1 in _blocks(layout, days)
+    ]
+
+
+def assemble(values, layout, days, max_row):
+    """
+    Poskládá načtené oblasti do řádků jako z get_all_values() - buňky jsou na
+    svých místech, vše mimo načtené oblasti je prázdné
+    """
+    blocks = _blocks(layout, days)
+    width = max(c1 for c0, c1 in blocks)
+    grid = [[""] * width for _ in range(max_row)]
+    for (c0, c1), rows in zip(blocks, values):
+        for r, row in enumerate(rows[:max_row]):
+            row = row[:c1 - c0 + 1]
+            grid[r][c0 - 1:c0 - 1 + len(row)] = row
+    return grid
@@ -0,0 +1,137 @@
+# -*- coding: utf-8 -*-
+"""
+Jedno plánování na list naráz (single-flight)
+- stejný request, který už běží, se připojí k jeho výsledku (ve stejném workeru
+  přímo, z jiného workeru přes uložený výsledek)
+- jiný request na stejný list čeká na zámek - souborový zámek (flock) platí
+  napříč gunicorn workery, takže list čte, plánuje a zapisuje vždy jen jeden
+"""
+
+import os
+import json
+import time
+import fcntl
+import hashlib
+import tempfile
+import threading
+from contextlib import contextmanager, ExitStack
+
+LOCK_DIR = os.environ.get('PLAN_LOCK_DIR', os.path.join(tempfile.gettempdir(), 'planovac_locks'))
+# Jak dlouho (s) nejvýš čekat na zámek listu
+LOCK_TIMEOUT = float(os.environ.get('PLAN_LOCK_TIMEOUT', 600))
+LOCK_POLL = 0.2
+
+_lock = threading.Lock()
+_flights = {}
+
+
+class SheetBusy(RuntimeError):
+    """List se plánuje příliš dlouho jiným requestem"""
+
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+def _digest(text):
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()[:32]
+
+
+@contextmanager
+def sheet_lock(sheet_name, timeout=LOCK_TIMEOUT):
+    """Exkluzivní zámek listu napříč procesy i vlákny"""
+    os.makedirs(LOCK_DIR, exist_ok=True)
+    path = os.path.join(LOCK_DIR, f"{_digest(sheet_name)}.lock")
+    deadline = time.monotonic() + timeout
+    with open(path, "a+") as f:
+        while True:
+            try:
+                fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                break
+            except BlockingIOError:
+                if time.monotonic() >= deadline:
+                    raise SheetBusy(f"List '{sheet_name}' se právě plánuje, zkus to později")
+                time.sleep(LOCK_POLL)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def _result_path(sheet_names):
+    return os.path.join(LOCK_DIR, f"{_digest(chr(0).join(sheet_names))}.result.json")
+
+
+def _load_result(sheet_names, key, since):
+    """Výsledek stejného requestu dokončeného jiným workerem po čase since"""
+    try:
+        with open(_result_path(sheet_names), encoding="utf-8") as f:
+            saved = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if saved.get("key") == key and saved.get("finished", 0) >= since:
+        return saved["result"]
+    return None
+
+
+def _save_result(sheet_names, key, result):
+    path = _result_path(sheet_names)
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"key": key, "finished": time.time(), "result": result}, f,
+                      ensure_ascii=False)
+        os.replace(tmp, path)
+    except (OSError, TypeError, ValueError) as e:
+        print(f"⚠️  Výsledek pro ostatní workery neuložen: {e}")
+
+
+def single_flight(sheet_names, options, fn, *args, **kwargs):
+    """
+    Spustí fn(*args, **kwargs) se zámkem všech listů sheet_names
+    Stejný request (listy + options) běžící jinde vrátí jeho výsledek
+    Vrací (výsledek, shared) - shared = výsledek je z cizího běhu
+    """
+    sheet_names = list(sheet_names)
+    key = _digest(json.dumps([sheet_names, options], sort_keys=True, ensure_ascii=False))
+
+    with _lock:
+        flight = _flights.get(key)
+        leader = flight is None
+        if leader:
+            flight = _flights[key] = _Flight()
+
+    if not leader:
+        print(f"✓ Stejné plánování {', '.join(sheet_names)} už běží - čekám na výsledek")
+        flight.done.wait()
+        if flight.error:
+            raise flight.error
+        return flight.result, True
+
+    started = time.time()
+    shared = False
+    try:
+        # Zámky vždy ve stejném pořadí, aby se dávky navzájem nezablokovaly
+        with ExitStack() as stack:
+            for name in sorted(set(sheet_names)):
+                stack.enter_context(sheet_lock(name))
+
+            result = _load_result(sheet_names, key, started)
+            if result is not None:
+                print(f"✓ Stejné plánování {', '.join(sheet_names)} dokončil jiný worker")
+                shared = True
+            else:
+                result = fn(*args, **kwargs)
+                _save_result(sheet_names, key, result)
+        flight.result = result
+        return result, shared
+    except Exception as e:
+        flight.error = e
+        raise
+    finally:
+        with _lock:
+            del _flights[key]
+        flight.done.set()
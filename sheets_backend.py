@@ -0,0 +1,246 @@
+# -*- coding: utf-8 -*-
+"""
+Backend pro práci s tabulkou - Google Sheets (gspread) nebo lokální snapshot
+
+Rozhraní sešitu (workbook):
+- title
+- read_ranges(ranges)  -> pro každý A1 rozsah seznam řádků (jako values:batchGet)
+- write_ranges(data)   -> data = [{"range": A1 rozsah, "values": [[...]]}]
+- throttled_seconds    -> kolik s se čekalo na kvóty API (snapshot vždy 0)
+- revision()           -> značka verze sešitu, mění se s každou úpravou
+                          (None = neznámá, viz read_cache)
+
+Backend má jedinou metodu open_workbook(). Snapshot (JSON soubor nebo adresář
+s CSV, jeden soubor na list) umožňuje plánovat bez Google - přehrát produkční
+vstupy lokálně, profilovat nebo zátěžově testovat bez čerpání kvót.
+
+Export snapshotu: python sheets_backend.py snapshot.json CERVEN FONDY_HODIN ZAMESTNANCI
+"""
+
+import os
+import csv
+import json
+import uuid
+import gspread
+
+import metrics
+import sheets_quota
+from sheets_client import get_workbook
+
+
+class SheetNotFound(Exception):
+    """List ve snapshotu neexistuje (obdoba APIError z Google)"""
+
+
+# Chyby čtení, po kterých má smysl zkusit načíst méně listů
+READ_ERRORS = (gspread.exceptions.APIError, SheetNotFound)
+
+
+def split_range(range_name):
+    """"'List'!A1:B2" -> ("List", "A1:B2"), celý list -> ("List", None)"""
+    if not range_name.startswith("'"):
+        name, _, a1 = range_name.partition("!")
+        return name, a1 or None
+
+    # Název v apostrofech, apostrof uvnitř je zdvojený
+    end = range_name.index("'", 1)
+    while range_name[end + 1:end + 2] == "'":
+        end = range_name.index("'", end + 2)
+    name = range_name[1:end].replace("''", "'")
+    return name, range_name[end + 2:] or None
+
+
+def drive_modified_time(spreadsheet):
+    """Revize sešitu Google - modifiedTime z Drive API (jeden malý GET)"""
+    meta = spreadsheet.client.get_file_drive_metadata(spreadsheet.id)
+    metrics.observe_api_call("drive_metadata")
+    return meta.get("modifiedTime")
+
+
+class GspreadWorkbook:
+    """
+    Google Sheets přes gspread - čtení i zápis jedním batch requestem
+    revision_source(spreadsheet) vrací revizi sešitu (None = revize se nezjišťuje)
+    """
+
+    def __init__(self, spreadsheet, revision_source=drive_modified_time):
+        self.spreadsheet = spreadsheet
+        self.revision_source = revision_source
+        self.throttled_seconds = 0.0
+
+    @property
+    def title(self):
+        return self.spreadsheet.title
+
+    @property
+    def key(self):
+        """Identita sešitu (pro cache podle listu, viz sheet_layout)"""
+        return self.spreadsheet.id
+
+    def revision(self):
+        return self.revision_source(self.spreadsheet) if self.revision_source else None
+
+    def read_ranges(self, ranges):
+        before = sheets_quota.thread_throttled()
+        resp = self.spreadsheet.values_batch_get(ranges)
+        self.throttled_seconds += sheets_quota.thread_throttled() - before
+        values = [vr.get("values", []) for vr in resp.get("valueRanges", [])]
+        metrics.observe_api_call("values_batch_get", bytes_read=len(json.dumps(values)))
+        return values
+
+    def write_ranges(self, data):
+        body = {
+            "valueInputOption": "RAW",
+            "data": data,
+        }
+        before = sheets_quota.thread_throttled()
+        self.spreadsheet.values_batch_update(body=body)
+        self.throttled_seconds += sheets_quota.thread_throttled() - before
+        metrics.observe_api_call("values_batch_update", bytes_written=len(json.dumps(body)))
+
+
+class GspreadBackend:
+    def __init__(self, spreadsheet_id, credentials_file, revision_source=drive_modified_time):
+        self.spreadsheet_id = spreadsheet_id
+        self.credentials_file = credentials_file
+        self.revision_source = revision_source
+
+    def open_workbook(self):
+        # Klient i Spreadsheet jsou sdílené v rámci procesu (viz sheets_client)
+        return GspreadWorkbook(get_workbook(self.spreadsheet_id, self.credentials_file),
+                               self.revision_source)
+
+
+def _trim(rows):
+    """Ořeže prázdné konce řádků a prázdné řádky na konci - jako Sheets API"""
+    out = []
+    for row in rows:
+        end = len(row)
+        while end and row[end - 1] in (None, ""):
+            end -= 1
+        out.append(list(row[:end]))
+    while out and not out[-1]:
+        out.pop()
+    return out
+
+
+class SnapshotWorkbook:
+    """
+    Sešit načtený ze snapshotu (JSON nebo adresář s CSV)
+    Zápisy se drží v paměti, s persist=True se uloží zpět do snapshotu
+    """
+
+    def __init__(self, path, persist=False):
+        self.path = path
+        self.key = os.path.abspath(path)
+        self.persist = persist
+        self.throttled_seconds = 0.0
+        # Zápisy v paměti (bez persist) se v mtime neprojeví
+        self.edit = None
+        if os.path.isdir(path):
+            self.title = os.path.basename(os.path.normpath(path))
+            self.sheets = {}
+            for filename in sorted(os.listdir(path)):
+                if filename.endswith(".csv"):
+                    with open(os.path.join(path, filename), newline="", encoding="utf-8") as f:
+                        self.sheets[filename[:-4]] = [row for row in csv.reader(f)]
+        else:
+            with open(path, encoding="utf-8") as f:
+                data = json.load(f)
+            self.title = data.get("title", os.path.basename(path))
+            self.sheets = data["sheets"]
+
+    def revision(self):
+        """Čas úpravy snapshotu + značka posledního zápisu v paměti"""
+        if os.path.isdir(self.path):
+            mtime = max([os.stat(os.path.join(self.path, f)).st_mtime_ns
+                         for f in os.listdir(self.path)] + [os.stat(self.path).st_mtime_ns])
+        else:
+            mtime = os.stat(self.path).st_mtime_ns
+        return f"{mtime}:{self.edit}"
+
+    def _sheet(self, name):
+        if name not in self.sheets:
+            raise SheetNotFound(f"List '{name}' ve snapshotu {self.path} neexistuje")
+        return self.sheets[name]
+
+    def read_ranges(self, ranges):
+        result = []
+        for range_name in ranges:
+            name, a1 = split_range(range_name)
+            rows = self._sheet(name)
+            if a1:
+                grid = gspread.utils.a1_range_to_grid_range(a1)
+                r0, r1 = grid.get("startRowIndex", 0), grid.get("endRowIndex", len(rows))
+                c0, c1 = grid.get("startColumnIndex", 0), grid.get("endColumnIndex")
+                rows = [row[c0:c1] for row in rows[r0:r1]]
+            result.append(_trim(rows))
+        return result
+
+    def write_ranges(self, data):
+        for item in data:
+            name, a1 = split_range(item["range"])
+            rows = self._sheet(name)
+            grid = gspread.utils.a1_range_to_grid_range(a1)
+            for dr, values in enumerate(item["values"]):
+                r = grid.get("startRowIndex", 0) + dr
+                while len(rows) <= r:
+                    rows.append([])
+                for dc, value in enumerate(values):
+                    c = grid.get("startColumnIndex", 0) + dc
+                    row = rows[r]
+                    while len(row) <= c:
+                        row.append("")
+                    row[c] = "" if value is None else value
+        self.edit = uuid.uuid4().hex
+        if self.persist:
+            self.save()
+
+    def save(self, path=None):
+        save_snapshot(self.title, self.sheets, path or self.path)
+
+
+class SnapshotBackend:
+    def __init__(self, path, persist=False):
+        self.path = path
+        self.persist = persist
+
+    def open_workbook(self):
+        # Každé otevření začíná z uloženého stavu (zápisy bez persist se nepřenáší)
+        return SnapshotWorkbook(self.path, self.persist)
+
+
+def save_snapshot(title, sheets, path):
+    """Uloží listy jako JSON (path končí .json) nebo adresář s CSV"""
+    if path.endswith(".json"):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"title": title, "sheets": sheets}, f, ensure_ascii=False)
+        return
+    os.makedirs(path, exist_ok=True)
+    for name, rows in sheets.items():
+        with open(os.path.join(path, f"{name}.csv"), "w", newline="", encoding="utf-8") as f:
+            csv.writer(f).writerows(rows)
+
+
+def default_backend(spreadsheet_id, credentials_file):
+    """Snapshot, pokud je nastavená env SHEETS_SNAPSHOT, jinak Google Sheets"""
+    snapshot = os.environ.get('SHEETS_SNAPSHOT')
+    if snapshot:
+        return SnapshotBackend(snapshot, persist=os.environ.get('SHEETS_SNAPSHOT_PERSIST') == '1')
+    return GspreadBackend(spreadsheet_id, credentials_file)
+
+
+if __name__ == "__main__":
+    import sys
+    from planner_sheets_v2 import SPREADSHEET_ID, CREDENTIALS_FILE
+
+    if len(sys.argv) < 3:
+        print("Použití: python sheets_backend.py <snapshot.json | adresář> LIST [LIST ...]")
+        sys.exit(1)
+
+    path, sheet_names = sys.argv[1], sys.argv[2:]
+    wb = GspreadBackend(SPREADSHEET_ID, CREDENTIALS_FILE).open_workbook()
+    ranges = [gspread.utils.absolute_range_name(name) for name in sheet_names]
+    sheets = dict(zip(sheet_names, wb.read_ranges(ranges)))
+    save_snapshot(wb.title, sheets, path)
+    print(f"✓ Snapshot {len(sheets)} listů uložen: {path}")
@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+"""
+Sdílené připojení ke Google Sheets
+Jeden autorizovaný klient a jeden Spreadsheet na proces (gunicorn worker)
+"""
+
+import os
+import json
+import datetime
+import threading
+import gspread
+import metrics
+from sheets_quota import QuotaHTTPClient
+from google.oauth2.service_account import Credentials
+from google.auth.transport.requests import Request
+
+SCOPES = [
+    'https://www.googleapis.com/auth/spreadsheets',
+    'https://www.googleapis.com/auth/drive'
+]
+
+# Token obnovíme s předstihem, ať se neobnovuje uprostřed requestu
+TOKEN_REFRESH_MARGIN = datetime.timedelta(minutes=5)
+# Timeout requestů na Sheets API v s (spojení, odpověď) - bez něj requests čeká
+# donekonečna a opakování při výpadku (sheets_quota) by se nikdy nespustilo
+CONNECT_TIMEOUT = 10.0
+READ_TIMEOUT = float(os.environ.get('SHEETS_TIMEOUT', 60))
+
+_lock = threading.Lock()
+_pool = {"pid": None, "client": None, "workbooks": {}}
+
+
+def load_credentials(credentials_file):
+    """Načte Service Account credentials (env GOOGLE_CREDENTIALS_JSON nebo soubor)"""
+    creds_json = os.environ.get('GOOGLE_CREDENTIALS_JSON')
+    if creds_json:
+        creds_dict = json.loads(creds_json)
+        return Credentials.from_service_account_info(creds_dict, scopes=SCOPES)
+    return Credentials.from_service_account_file(credentials_file, scopes=SCOPES)
+
+
+def _refresh_if_needed(client):
+    """Obnoví token, pokud chybí nebo brzy vyprší (přes stejnou HTTP session)"""
+    http = client.http_client
+    creds = http.auth
+    now = datetime.datetime.utcnow()
+    if creds.token is None or creds.expiry is None or creds.expiry - now < TOKEN_REFRESH_MARGIN:
+        creds.refresh(Request(http.session))
+
+
+def get_client(credentials_file):
+    """Vrátí autorizovaného gspread klienta sdíleného v rámci procesu"""
+    with _lock:
+        # Po forku (gunicorn) nesmíme sdílet session s rodičem
+        if _pool["pid"] != os.getpid():
+            _pool["pid"] = os.getpid()
+            _pool["client"] = None
+            _pool["workbooks"] = {}
+
+        if _pool["client"] is None:
+            # Rozkládání requestů podle kvót a opakování při 429/5xx (viz sheets_quota)
+            _pool["client"] = gspread.authorize(load_credentials(credentials_file),
+                                                http_client=QuotaHTTPClient)
+            _pool["client"].http_client.set_timeout((CONNECT_TIMEOUT, READ_TIMEOUT))
+
+        client = _pool["client"]
+        _refresh_if_needed(client)
+        return client
+
+
+def get_workbook(spreadsheet_id, credentials_file):
+    """Vrátí Spreadsheet handle - open_by_key se volá jen jednou na proces"""
+    client = get_client(credentials_file)
+    with _lock:
+        wb = _pool["workbooks"].get(spreadsheet_id)
+        if wb is None:
+            wb = client.open_by_key(spreadsheet_id)
+            metrics.observe_api_call("open_by_key")
+            _pool["workbooks"][spreadsheet_id] = wb
+        return wb
+
+
+def read_sheets(wb, sheet_names):
+    """
+    Načte celé listy jedním čtením (values:batchGet)
+    wb je sešit z sheets_backend (Google Sheets nebo snapshot)
+    Vrací {název listu: řádky} ve stejném tvaru jako get_all_values()
+    """
+    ranges = [gspread.utils.absolute_range_name(name) for name in sheet_names]
+    return {
+        name: gspread.utils.fill_gaps(values)
+        for name, values in zip(sheet_names, wb.read_ranges(ranges))
+    }
@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+"""
+Hlídání kvót Google Sheets API
+- čtení a zápisy se rozkládají podle minutových limitů (token bucket sdílený
+  všemi vlákny workeru)
+- 429 a 5xx se opakují s exponenciálním čekáním s náhodným rozptylem,
+  Retry-After od Googlu má přednost
+Při velké zátěži tak /plan jen zpomalí místo chyby 500
+"""
+
+import os
+import time
+import random
+import threading
+import email.utils
+
+import gspread
+import requests
+
+import metrics
+
+# Limity na minutu (Google: 60 čtení a 60 zápisů za minutu na uživatele)
+READS_PER_MINUTE = int(os.environ.get('SHEETS_READS_PER_MINUTE', 60))
+WRITES_PER_MINUTE = int(os.environ.get('SHEETS_WRITES_PER_MINUTE', 60))
+# Opakování při 429 / 5xx / výpadku spojení
+MAX_RETRIES = int(os.environ.get('SHEETS_MAX_RETRIES', 5))
+BACKOFF_BASE = 1.0
+BACKOFF_MAX = 64.0
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+_lock = threading.Lock()
+_state = {"pid": None, "buckets": None}
+_local = threading.local()
+
+
+class TokenBucket:
+    """Minutový limit - plný kbelík = celý limit, doplňuje se průběžně"""
+
+    def __init__(self, per_minute):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """Vezme jeden token, případně počká. Vrací dobu čekání (s)"""
+        waited = 0.0
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return waited
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+            waited += wait
+
+
+def _bucket(kind):
+    """Kbelíky jsou na proces - po forku (gunicorn) se vytvoří znovu"""
+    with _lock:
+        if _state["pid"] != os.getpid():
+            _state["pid"] = os.getpid()
+            _state["buckets"] = {
+                "read": TokenBucket(READS_PER_MINUTE),
+                "write": TokenBucket(WRITES_PER_MINUTE),
+            }
+        return _state["buckets"][kind]
+
+
+def _record(seconds, kind):
+    if seconds <= 0:
+        return
+    _local.throttled = getattr(_local, "throttled", 0.0) + seconds
+    metrics.SHEETS_THROTTLE_SECONDS.labels(kind).inc(seconds)
+
+
+def thread_throttled():
+    """Kolik s toto vlákno celkem čekalo na kvóty (pro rozdíl před/po volání)"""
+    return getattr(_local, "throttled", 0.0)
+
+
+def retry_after_seconds(value):
+    """Retry-After jako počet sekund nebo HTTP datum"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, when.timestamp() - time.time())
+
+
+def backoff_delay(attempt, retry_after=None):
+    """Čekání před dalším pokusem - Retry-After, jinak 2^attempt s rozptylem"""
+    seconds = retry_after_seconds(retry_after)
+    if seconds is not None:
+        return min(seconds, BACKOFF_MAX)
+    ceiling = min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt)
+    return random.uniform(ceiling / 2, ceiling)
+
+
+class QuotaHTTPClient(gspread.HTTPClient):
+    """HTTP klient gspreadu s rozkládáním requestů a opakováním"""
+
+    def request(self, method, endpoint, *args, **kwargs):
+        bucket = _bucket("read" if method.upper() == "GET" else "write")
+        attempt = 0
+        while True:
+            _record(bucket.acquire(), "pacing")
+            try:
+                return super().request(method, endpoint, *args, **kwargs)
+            except gspread.exceptions.APIError as e:
+                status = e.response.status_code
+                if status not in RETRY_STATUS or attempt >= MAX_RETRIES:
+                    raise
+                retry_after = e.response.headers.get("Retry-After")
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+                if attempt >= MAX_RETRIES:
+                    raise
+                status, retry_after = "connection", None
+
+            wait = backoff_delay(attempt, retry_after)
+            attempt += 1
+            metrics.SHEETS_RETRIES.labels(str(status)).inc()
+            print(f"⏳ Sheets API {status}, čekám {wait:.1f}s (pokus {attempt}/{MAX_RETRIES})")
+            time.sleep(wait)
+            _record(wait, "backoff")
@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+"""
+Dávkový zápis do Google Sheets (nebo snapshotu, viz sheets_backend)
+Sbírá změny buněk a posílá je jako values:batchUpdate místo update_cell po jedné
+Posílají se jen změněné buňky, sousední v řádku sloučené do jednoho rozsahu
+"""
+
+import gspread
+
+# Kolik buněk pošleme v jednom requestu (limit velikosti payloadu)
+MAX_CELLS_PER_REQUEST = 5000
+
+
+class SheetWriter:
+    """Sběrač změn pro jeden list"""
+
+    def __init__(self, wb, sheet_name, max_cells_per_request=MAX_CELLS_PER_REQUEST):
+        self.wb = wb
+        self.sheet_name = sheet_name
+        self.max_cells_per_request = max_cells_per_request
+        self.changes = {}
+        self.requests_sent = 0
+
+    def set(self, row, col, value, orig=None):
+        """
+        Zapamatuje si novou hodnotu buňky (řádek/sloupec od 1)
+        Pokud se shoduje s původní hodnotou, nic nezapisuje - vrací False
+        """
+        if orig is not None and value == orig:
+            return False
+        self.changes[(row, col)] = value
+        return True
+
+    def __len__(self):
+        return len(self.changes)
+
+    def _runs(self):
+        """Seskupí změny do souvislých úseků v řádku: (řádek, první sloupec, hodnoty)"""
+        run_row, run_col, run_values = None, None, []
+        for (row, col), value in sorted(self.changes.items()):
+            if row == run_row and col == run_col + len(run_values):
+                run_values.append(value)
+                continue
+            if run_values:
+                yield run_row, run_col, run_values
+            run_row, run_col, run_values = row, col, [value]
+        if run_values:
+            yield run_row, run_col, run_values
+
+    def _ranges(self):
+        """Změny jako seznam (A1 rozsah, hodnoty, počet buněk)"""
+        for row, col, values in self._runs():
+            start = gspread.utils.rowcol_to_a1(row, col)
+            end = gspread.utils.rowcol_to_a1(row, col + len(values) - 1)
+            a1 = start if len(values) == 1 else f"{start}:{end}"
+            yield gspread.utils.absolute_range_name(self.sheet_name, a1), [values], len(values)
+
+    def flush(self):
+        """Zapíše všechny změny - jeden batchUpdate na každý chunk. Vrací počet requestů."""
+        chunk, chunk_cells, sent = [], 0, 0
+        for range_name, values, cells in self._ranges():
+            if chunk and chunk_cells + cells > self.max_cells_per_request:
+                self._send(chunk)
+                sent += 1
+                chunk, chunk_cells = [], 0
+            chunk.append({"range": range_name, "values": values})
+            chunk_cells += cells
+
+        if chunk:
+            self._send(chunk)
+            sent += 1
+
+        self.changes = {}
+        self.requests_sent += sent
+        return sent
+
+    def _send(self, data):
+        self.wb.write_ranges(data)
@@ -0,0 +1,294 @@
+# -*- coding: utf-8 -*-
+"""
+Inkrementální kontrola hard pravidel pro plánovače
+Každá osoba má bitové masky dnů (bit di = den di), takže can_assign
+je jen pár bitových testů místo procházení předchozích dnů
+ShiftArrays drží stejná pravidla v NumPy maticích pro všechny osoby najednou
+
+history - volitelné poslední dny předchozího měsíce (pro každou osobu seznam
+hodnot od nejstaršího), aby pravidla platila i přes hranici měsíce
+assign - řádky hodnot nebo Schedule (masky se pak berou přímo z matice)
+"""
+
+import numpy as np
+
+from schedule import Schedule
+
+# Volitelné pravidlo s delším oknem: max N nočních v každých 7 po sobě jdoucích
+# dnech (None = vypnuto). Nová N v den di se počítá s 6 dny před ní
+MAX_NIGHTS_PER_7_DAYS = None
+# Kolik víkendů bez D/N musí mít každá sestra
+MIN_FREE_WEEKENDS = 2
+# Cena porušení MIN_FREE_WEEKENDS v jednotkách směn - solver víkend
+# vezme jen tehdy, když by jinak zůstal slot neobsazený
+WEEKEND_PENALTY = 1000.0
+
+
+def history_width(history):
+    return max((len(row) for row in history), default=0) if history else 0
+
+
+def window_count(mask, di, width):
+    """Počet nastavených bitů ve dnech [di - width, di)"""
+    lo = max(0, di - width)
+    return ((mask >> lo) & ((1 << (di - lo)) - 1)).bit_count()
+
+
+class ShiftState:
+    """
+    Stav pravidel pro všechny osoby
+    taken = den je obsazený (směna nebo blokovaná hodnota)
+    work  = den s pracovní směnou D/N
+    night = den s noční N
+    """
+
+    def __init__(self, assign, max_consec, history=None):
+        self.max_consec = max_consec
+        self.run_mask = (1 << max_consec) - 1
+        # Bity 0..offset-1 patří historii, den di je bit di + offset
+        self.offset = history_width(history)
+        if isinstance(assign, Schedule):
+            taken, work, night = assign.bitmasks()
+            self.taken = [m << self.offset for m in taken]
+            self.work = [m << self.offset for m in work]
+            self.night = [m << self.offset for m in night]
+        else:
+            self.taken = []
+            self.work = []
+            self.night = []
+            for row in assign:
+                taken = work = night = 0
+                for b, val in enumerate(row, self.offset):
+                    if val is not None:
+                        taken |= 1 << b
+                    if val in ("D", "N"):
+                        work |= 1 << b
+                    if val == "N":
+                        night |= 1 << b
+                self.taken.append(taken)
+                self.work.append(work)
+                self.night.append(night)
+
+        # Historie se jen přidá do work / night (není to obsazený den měsíce)
+        for i, prev in enumerate(history or []):
+            for b, val in enumerate(prev, self.offset - len(prev)):
+                if val in ("D", "N"):
+                    self.work[i] |= 1 << b
+                if val == "N":
+                    self.night[i] |= 1 << b
+
+    def can_assign(self, i, di, shift):
+        """Kontrola hard pravidel - konstantní čas"""
+        b = di + self.offset
+
+        # Už tam něco je
+        if self.taken[i] >> b & 1:
+            return False
+
+        # Max max_consec směn za sebou (všech max_consec předchozích dnů je pracovních)
+        if b >= self.max_consec:
+            window = self.run_mask << (b - self.max_consec)
+            if self.work[i] & window == window:
+                return False
+
+        # Po N musí volno
+        if b > 0 and self.night[i] >> (b - 1) & 1:
+            return False
+
+        if shift == "N" and MAX_NIGHTS_PER_7_DAYS is not None:
+            if window_count(self.night[i], b, 6) >= MAX_NIGHTS_PER_7_DAYS:
+                return False
+
+        return True
+
+    def fits(self, i, di, shift):
+        """
+        Kontrola hard pravidel v obou směrech - pro plánování dnů v libovolném pořadí
+        (can_assign hlídá jen předchozí dny, fits i ty následující)
+        """
+        b = di + self.offset
+        if self.taken[i] >> b & 1:
+            return False
+
+        work = self.work[i]
+
+        # Po N musí volno / N nesmí být před už obsazenou směnou
+        if b > 0 and self.night[i] >> (b - 1) & 1:
+            return False
+        if shift == "N" and work >> (b + 1) & 1:
+            return False
+
+        # Souvislý úsek směn včetně di nesmí být delší než max_consec
+        left = 0
+        while left < self.max_consec and b - 1 - left >= 0 and work >> (b - 1 - left) & 1:
+            left += 1
+        right = 0
+        while right < self.max_consec and work >> (b + 1 + right) & 1:
+            right += 1
+        if left + 1 + right > self.max_consec:
+            return False
+
+        if shift == "N" and MAX_NIGHTS_PER_7_DAYS is not None:
+            night = self.night[i] | (1 << b)
+            for start in range(max(0, b - 6), b + 1):
+                if window_count(night, start + 7, 7) > MAX_NIGHTS_PER_7_DAYS:
+                    return False
+
+        return True
+
+    def assign(self, i, di, shift):
+        """Zaznamená přiřazení směny D/N"""
+        bit = 1 << (di + self.offset)
+        self.taken[i] |= bit
+        self.work[i] |= bit
+        if shift == "N":
+            self.night[i] |= bit
+
+    def unassign(self, i, di, shift):
+        """Vrátí přiřazení zpět (undo při backtrackingu)"""
+        bit = ~(1 << (di + self.offset))
+        self.taken[i] &= bit
+        self.work[i] &= bit
+        self.night[i] &= bit
+
+
+class ShiftArrays:
+    """
+    Stejná pravidla jako ShiftState, ale jako matice P×D (NumPy)
+    eligible() vrací masku všech osob, kterým lze v daný den dát směnu
+    """
+
+    def __init__(self, assign, max_consec, days, history=None):
+        P = assign.people if isinstance(assign, Schedule) else len(assign)
+        self.max_consec = max_consec
+        # Prvních offset sloupců patří historii, den di je sloupec di + offset
+        self.offset = history_width(history)
+        cols = self.offset + days
+        self.taken = np.zeros((P, cols), dtype=bool)
+        self.work = np.zeros((P, cols), dtype=bool)
+        self.night = np.zeros((P, cols), dtype=bool)
+
+        if isinstance(assign, Schedule):
+            month = slice(self.offset, self.offset + assign.days)
+            self.taken[:, month], self.work[:, month], self.night[:, month] = assign.masks()
+        else:
+            for i, row in enumerate(assign):
+                for b, val in enumerate(row, self.offset):
+                    if val is not None:
+                        self.taken[i, b] = True
+                    if val in ("D", "N"):
+                        self.work[i, b] = True
+                    if val == "N":
+                        self.night[i, b] = True
+
+        for i, prev in enumerate(history or []):
+            for b, val in enumerate(prev, self.offset - len(prev)):
+                if val in ("D", "N"):
+                    self.work[i, b] = True
+                if val == "N":
+                    self.night[i, b] = True
+
+    def eligible(self, di, shift):
+        """Maska osob, které splňují hard pravidla pro směnu v den di"""
+        b = di + self.offset
+        ok = ~self.taken[:, b]
+
+        # Max max_consec směn za sebou
+        if b >= self.max_consec:
+            ok &= ~self.work[:, b - self.max_consec:b].all(axis=1)
+
+        # Po N musí volno
+        if b > 0:
+            ok &= ~self.night[:, b - 1]
+
+        if shift == "N" and MAX_NIGHTS_PER_7_DAYS is not None:
+            ok &= self.night[:, max(0, b - 6):b].sum(axis=1) < MAX_NIGHTS_PER_7_DAYS
+
+        return ok
+
+    def assign(self, idx, di, shift):
+        """Zaznamená směnu pro jednu osobu nebo pole osob"""
+        b = di + self.offset
+        self.taken[idx, b] = True
+        self.work[idx, b] = True
+        if shift == "N":
+            self.night[idx, b] = True
+
+
+class CalendarCounters:
+    """
+    Víkendy a svátky - počítadla pro každou osobu
+    day_index = (weekend_of, holiday) z work_calendar.day_types
+    free[i] = kolik víkendů je bez D/N, holiday_shifts[i] = D/N o svátcích
+    Kontroly i přiřazení jsou v konstantním čase (idx = osoba nebo pole osob)
+    """
+
+    def __init__(self, assign, day_index, min_free_weekends=MIN_FREE_WEEKENDS):
+        if not isinstance(assign, Schedule):
+            assign = Schedule.from_rows(assign)
+        weekend_of, holiday = day_index
+        # Dny navíc (delší plán než měsíc) jsou všední
+        days = assign.days
+        self.weekend_of = list(weekend_of[:days]) + [-1] * (days - len(weekend_of))
+        self.holiday = list(holiday[:days]) + [False] * (days - len(holiday))
+        self.min_free = min_free_weekends
+
+        work = assign.masks()[1]
+        weekends = max(self.weekend_of, default=-1) + 1
+        self.weekend_work = np.zeros((assign.people, weekends), dtype=np.int16)
+        self.holiday_shifts = np.zeros(assign.people, dtype=np.int16)
+        for di, w in enumerate(self.weekend_of):
+            if w >= 0:
+                self.weekend_work[:, w] += work[:, di]
+            if self.holiday[di]:
+                self.holiday_shifts += work[:, di]
+        self.free = (self.weekend_work == 0).sum(axis=1)
+
+    def special(self, di):
+        """Den je víkend nebo svátek (jinak je penalty vždy 0)"""
+        return self.weekend_of[di] >= 0 or self.holiday[di]
+
+    def breaks_weekend(self, idx, di):
+        """Směna v di by sestře vzala volný víkend, který už nemá nazbyt"""
+        w = self.weekend_of[di]
+        if w < 0:
+            return False
+        return (self.weekend_work[idx, w] == 0) & (self.free[idx] <= self.min_free)
+
+    def penalty(self, idx, di):
+        """Cena směny v di v jednotkách směn - porušený víkend + dosavadní svátky"""
+        if not self.special(di):
+            return 0.0
+        cost = WEEKEND_PENALTY * self.breaks_weekend(idx, di)
+        if self.holiday[di]:
+            cost = cost + self.holiday_shifts[idx]
+        return cost
+
+    def holiday_later(self, idx, di):
+        """
+        Sestra může ještě vzít některý pozdější svátek o víkendu, aniž by si vzala
+        poslední volné víkendy - na svátek v di se má nechat až po ostatních
+        """
+        later = False
+        for dj in range(di + 1, len(self.holiday)):
+            if self.holiday[dj] and self.weekend_of[dj] >= 0:
+                later = later | ~self.breaks_weekend(idx, dj)
+        return later
+
+    def assign(self, idx, di):
+        """Zaznamená D/N pro jednu osobu nebo pole osob"""
+        w = self.weekend_of[di]
+        if w >= 0:
+            self.free[idx] -= self.weekend_work[idx, w] == 0
+            self.weekend_work[idx, w] += 1
+        if self.holiday[di]:
+            self.holiday_shifts[idx] += 1
+
+    def unassign(self, i, di):
+        """Vrátí D/N zpět (undo při backtrackingu, tahy lokálního vylepšení)"""
+        w = self.weekend_of[di]
+        if w >= 0:
+            self.weekend_work[i, w] -= 1
+            self.free[i] += self.weekend_work[i, w] == 0
+        if self.holiday[di]:
+            self.holiday_shifts[i] -= 1
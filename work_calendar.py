@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+"""
+Typy dnů v měsíci - víkendy a svátky pro pravidla plánovačů
+day_types() se počítá jednou pro (rok, měsíc), solvery dostávají hotový index
+"""
+
+import calendar
+import datetime
+import functools
+
+# České svátky 2026
+HOLIDAYS_2026 = {
+    (1, 1): "Nový rok",
+    (4, 13): "Velikonoční pondělí",  # Pohyblivý - pro 2026
+    (5, 1): "Svátek práce",
+    (5, 8): "Den vítězství",
+    (7, 5): "Den slovanských věrozvěstů Cyrila a Metoděje",
+    (7, 6): "Den upálení mistra Jana Husa",
+    (9, 28): "Den české státnosti",
+    (10, 28): "Den vzniku samostatného československého státu",
+    (11, 17): "Den boje za svobodu a demokracii",
+    (12, 24): "Štědrý den",
+    (12, 25): "1. svátek vánoční",
+    (12, 26): "2. svátek vánoční",
+}
+
+def is_holiday(year, month, day):
+    """Kontrola zda je den svátek"""
+    return (month, day) in HOLIDAYS_2026
+
+
+@functools.lru_cache(maxsize=None)
+def day_types(year, month):
+    """
+    Index dnů měsíce - vrací (weekend_of, holiday), oboje n-tice po dnech
+    weekend_of[di] = pořadí víkendu (so+ne, neúplný na okraji měsíce taky), -1 = všední den
+    holiday[di] = den je svátek
+    """
+    weekend_of = []
+    holiday = []
+    weekend = -1
+    prev_weekend = False
+    for day in range(1, calendar.monthrange(year, month)[1] + 1):
+        is_weekend = datetime.date(year, month, day).weekday() >= 5
+        if is_weekend and not prev_weekend:
+            weekend += 1
+        weekend_of.append(weekend if is_weekend else -1)
+        holiday.append(is_holiday(year, month, day))
+        prev_weekend = is_weekend
+    return tuple(weekend_of), tuple(holiday)